@@ -1,3 +1,6 @@
 """ChessBlunder AI backend application package."""
 
+import time
 
+# Reference point for the startup timings reported by /health/ready.
+STARTED_AT = time.perf_counter()
@@ -1,10 +1,13 @@
 from fastapi import APIRouter
 
-from app.api.routes import health, pgn
+from app.api.routes import health, metrics, pgn, players, tasks
 
 api_router = APIRouter()
 
 api_router.include_router(health.router, tags=["health"])
+api_router.include_router(metrics.router, tags=["metrics"])
 api_router.include_router(pgn.router, tags=["pgn"])
+api_router.include_router(players.router, tags=["players"])
+api_router.include_router(tasks.router, tags=["tasks"])
 
 
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from app.services.engine import get_engine_pool
 
 router = APIRouter()
 
@@ -8,3 +11,25 @@ def read_root():
     return {"message": "ChessBlunder AI API"}
 
 
+@router.get("/health")
+def liveness():
+    """
+    The process is up and serving HTTP.
+    """
+    return {"ok": True}
+
+
+@router.get("/health/ready")
+def readiness(request: Request):
+    """
+    200 once every Stockfish engine is spawned and warmed; 503 until then.
+    """
+    pool = get_engine_pool()
+    ready = pool.started
+    body = {
+        "ready": ready,
+        "engines": {"size": pool.size, "idle": pool.idle},
+        "startup": getattr(request.app.state, "startup", None),
+        "error": pool.start_error,
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from app.services.admission import get_admission_controller
+from app.services.engine import get_engine_pool
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def read_metrics():
+    """
+    Operational counters: admission lanes (queue depth, admitted/rejected,
+    queue wait percentiles) and engine supervision (restarts, retries).
+    """
+    return {
+        "ok": True,
+        "data": {
+            "admission": get_admission_controller().stats(),
+            "engines": get_engine_pool().stats(),
+        },
+    }
@@ -1,21 +1,102 @@
+import asyncio
+import json
 import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 
-from app.schemas.pgn import LearningInsightsRequest, PGNIn
-from app.services.analysis import analyze_pgn
+from app.schemas.pgn import LearningInsightsRequest, PGNBatchIn, PGNIn
+from app.services.admission import LANES, AdmissionRejected, get_admission_controller
+from app.services.analysis import analyze_pgn, analyze_pgn_batch
 from app.services.llm import generate_learning_insights
+from app.services.profiling import Profiler
+from app.services.store import get_store
 
 router = APIRouter()
 logger = logging.getLogger("chessblunder-api")
 
+T = TypeVar("T")
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """
+    Await `work`, cancelling it as soon as the client goes away so abandoned
+    requests don't keep an engine (or an LLM call) busy.
+    """
+    task = asyncio.ensure_future(work)
+
+    async def watch() -> None:
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                task.cancel()
+                return
+
+    watcher = asyncio.create_task(watch())
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if not watcher.done():
+            # We were cancelled ourselves (e.g. server shutdown), not the client.
+            raise
+        logger.info("Client disconnected; cancelled in-flight work")
+        raise HTTPException(status_code=499, detail="Client closed request.") from None
+    finally:
+        watcher.cancel()
+
+
+async def _admitted(
+    lane: str,
+    work: Callable[[], Awaitable[T]],
+    profiler: Profiler | None = None,
+) -> T:
+    """Run `work` once the admission controller grants a slot in `lane`."""
+    if profiler is not None:
+        queued = time.perf_counter()
+    async with get_admission_controller().admit(lane):
+        if profiler is not None:
+            profiler.add("admission", time.perf_counter() - queued)
+        return await work()
+
+
+def _too_busy(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Analysis capacity exhausted ({e.lane} queue full). Retry later.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 
 @router.post("/pgn")
-def receive_pgn(payload: PGNIn):
+async def receive_pgn(
+    payload: PGNIn,
+    request: Request,
+    x_analysis_lane: str = Header("interactive", description="interactive or batch"),
+    profile: bool = Query(False, description="Include a timing breakdown in the response"),
+    x_profile: bool = Header(False, description="Same as ?profile=true"),
+):
     logger.info("Received PGN:\n%s", payload.pgn)
+    if x_analysis_lane not in LANES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis lane: {x_analysis_lane}")
+    profiler = Profiler() if profile or x_profile else None
     try:
         logger.info("Analyzing PGN...")
-        analysis = analyze_pgn(payload.pgn)
+        analysis = await _cancel_on_disconnect(
+            request,
+            _admitted(
+                x_analysis_lane,
+                lambda: analyze_pgn(payload.pgn, profiler=profiler),
+                profiler,
+            ),
+        )
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _too_busy(e) from e
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
     except FileNotFoundError as e:
@@ -28,22 +109,92 @@ def receive_pgn(payload: PGNIn):
         logger.exception("Stockfish analysis failed")
         raise HTTPException(status_code=500, detail="Stockfish analysis failed.") from e
 
-    return {"ok": True, "analysis": analysis}
+    store = await run_in_threadpool(get_store)
+    if store is not None:
+        try:
+            analysis["gameId"] = await run_in_threadpool(store.save_analysis, analysis)
+        except Exception:
+            # Persistence is best-effort; the caller still gets their analysis.
+            logger.exception("Failed to store analysis")
+
+    if profiler is None:
+        return {"ok": True, "analysis": analysis}
+
+    # Serialize by hand so the serialization cost itself lands in the report.
+    started = time.perf_counter()
+    analysis_json = json.dumps(jsonable_encoder(analysis))
+    profiler.add("serialize", time.perf_counter() - started)
+    profile_json = json.dumps(profiler.report(analysis["plies"]))
+    return Response(
+        content=f'{{"ok": true, "analysis": {analysis_json}, "profile": {profile_json}}}',
+        media_type="application/json",
+    )
+
+
+@router.post("/pgn/batch")
+async def receive_pgn_batch(
+    payload: PGNBatchIn,
+    request: Request,
+    x_analysis_lane: str = Header("batch", description="interactive or batch"),
+):
+    """
+    Analyse several games together. Positions shared between games (typically
+    a common opening) are searched once; each game's result is the same as
+    POST /pgn would return for it.
+    """
+    logger.info("Received batch of %d PGNs", len(payload.pgns))
+    if x_analysis_lane not in LANES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis lane: {x_analysis_lane}")
+    try:
+        batch = await _cancel_on_disconnect(
+            request,
+            _admitted(x_analysis_lane, lambda: analyze_pgn_batch(payload.pgns)),
+        )
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _too_busy(e) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=500,
+            detail="Stockfish engine not found. Set STOCKFISH_PATH or install stockfish.",
+        ) from e
+    except Exception as e:
+        logger.exception("Stockfish batch analysis failed")
+        raise HTTPException(status_code=500, detail="Stockfish analysis failed.") from e
+
+    store = await run_in_threadpool(get_store)
+    if store is not None:
+        try:
+            game_ids = await run_in_threadpool(store.save_analyses, batch["games"])
+            for analysis, game_id in zip(batch["games"], game_ids):
+                analysis["gameId"] = game_id
+        except Exception:
+            logger.exception("Failed to store batch analyses")
+
+    return {"ok": True, "data": batch}
 
 
 @router.post("/learning-insights")
-def get_learning_insights(payload: LearningInsightsRequest):
+async def get_learning_insights(payload: LearningInsightsRequest, request: Request):
     """
     Generate learning insights for a player's mistakes and blunders using AI.
     """
     logger.info("Generating learning insights for %s", payload.playerColor)
     try:
-        insights = generate_learning_insights(
-            plies=payload.plies,
-            player_color=payload.playerColor,
-            game_headers=payload.headers,
+        insights = await _cancel_on_disconnect(
+            request,
+            generate_learning_insights(
+                plies=payload.plies,
+                player_color=payload.playerColor,
+                game_headers=payload.headers,
+            ),
         )
         return {"ok": True, "data": insights}
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.store import AnalysisStore, get_store
+
+router = APIRouter(prefix="/players")
+
+
+def _require_store() -> AnalysisStore:
+    store = get_store()
+    if store is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis store not configured. Set ANALYSIS_DB_PATH.",
+        )
+    return store
+
+
+@router.get("/{player}/acpl-trend")
+def get_acpl_trend(player: str, limit: int = Query(200, ge=1, le=10_000)):
+    """
+    ACPL for each of the player's most recent stored games.
+    """
+    return {"ok": True, "data": _require_store().acpl_trend(player, limit=limit)}
+
+
+@router.get("/{player}/phases")
+def get_phase_stats(player: str, limit: int | None = Query(None, ge=1)):
+    """
+    Blunder, mistake and inaccuracy rates per game phase.
+    """
+    return {"ok": True, "data": _require_store().blunder_rate_by_phase(player, limit=limit)}
+
+
+@router.get("/{player}/accuracy")
+def get_accuracy(player: str, limit: int | None = Query(None, ge=1)):
+    """
+    Accuracy and ACPL for each of the player's stored games, plus totals.
+    """
+    return {"ok": True, "data": _require_store().player_accuracy(player, limit=limit)}
+
+
+@router.get("/{player}/worst-openings")
+def get_worst_openings(
+    player: str,
+    min_games: int = Query(3, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Openings with the highest ACPL among those the player has enough games in.
+    """
+    data = _require_store().worst_openings(player, min_games=min_games, limit=limit)
+    return {"ok": True, "data": data}
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException
+
+from app.schemas.pgn import PGNBatchTaskIn, PGNIn
+from app.services.work_queue import ANALYZE_PGN, ANALYZE_PGN_BATCH, WorkQueue, get_work_queue
+
+router = APIRouter(prefix="/tasks")
+
+
+def _require_queue() -> WorkQueue:
+    queue = get_work_queue()
+    if queue is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Work queue not configured. Set WORK_QUEUE_PATH.",
+        )
+    return queue
+
+
+@router.post("")
+def submit_task(payload: PGNIn):
+    """
+    Queue a PGN for analysis by a worker (`python -m app.worker`).
+    Poll GET /tasks/{taskId} for the result.
+    """
+    task_id = _require_queue().enqueue(ANALYZE_PGN, {"pgn": payload.pgn})
+    return {"ok": True, "data": {"taskId": task_id}}
+
+
+@router.post("/batch")
+def submit_batch_task(payload: PGNBatchTaskIn):
+    """
+    Queue a batch of PGNs for one worker to analyse together, searching
+    shared positions once. GET /tasks/{taskId} reports `progress` while it
+    runs and the same `data` as POST /pgn/batch once done.
+    """
+    task_id = _require_queue().enqueue(ANALYZE_PGN_BATCH, {"pgns": payload.pgns})
+    return {"ok": True, "data": {"taskId": task_id}}
+
+
+@router.get("/{task_id}")
+def get_task(task_id: int):
+    """
+    Task status (pending, leased, done or failed); `result` holds the analysis once done
+    and `progress` the latest progress a worker reported while running it.
+    """
+    task = _require_queue().get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found.")
+    return {"ok": True, "data": task}
@@ -1,12 +1,36 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    stockfish_path: str
-    stockfish_depth: int
-    groq_api_key: str
+    # Unset means: look for `stockfish` on PATH, then the Debian location.
+    stockfish_path: str | None = None
+    stockfish_depth: int = 12
+    # Only needed for /learning-insights; analysis-only deployments can omit it.
+    groq_api_key: str | None = None
+    # Number of Stockfish processes kept running; bounds concurrent analyses.
+    stockfish_pool_size: int = 2
+    # Depth of the warm-up search each engine runs before /health/ready reports ready.
+    stockfish_warmup_depth: int = 8
+    # A search that takes longer is treated as a hung engine: it is killed,
+    # restarted and the position retried, at most `stockfish_max_retries` times.
+    stockfish_search_timeout: float = 30.0
+    stockfish_max_retries: int = 2
+    # Admission control: per-lane queue bounds and fair-share weights.
+    interactive_queue_size: int = Field(32, ge=1)
+    interactive_weight: int = Field(4, ge=1)
+    batch_queue_size: int = Field(256, ge=1)
+    batch_weight: int = Field(1, ge=1)
+    # Shared SQLite work queue for `python -m app.worker`; task routes are disabled when unset.
+    work_queue_path: str | None = None
+    work_max_attempts: int = 3
+    work_lease_seconds: float = 30.0
+    # SQLite file for persisted analyses; persistence is disabled when unset.
+    analysis_db_path: str | None = None
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -14,4 +38,7 @@ class Settings(BaseSettings):
     )
 
 
-settings = Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    """Settings are read on first use rather than at import time."""
+    return Settings()
@@ -1,15 +1,76 @@
+import asyncio
+import importlib
 import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app import STARTED_AT
 from app.api.router import api_router
+from app.services.engine import EnginePool, get_engine_pool
+from app.services.store import get_store
+
+logger = logging.getLogger("chessblunder-api")
+
+
+# Backoff between engine start attempts while the pool isn't up yet.
+_START_RETRY_INITIAL = 1.0
+_START_RETRY_MAX = 30.0
+
+
+async def _warm_up(app: FastAPI, pool: EnginePool) -> None:
+    # Load NumPy (used for per-game stats) before the first request needs it.
+    await asyncio.to_thread(importlib.import_module, "app.services.stats")
+    # Opening the store may backfill aggregate tables, which takes seconds on
+    # a large database: do it off the event loop, before a request needs it.
+    try:
+        await asyncio.to_thread(get_store)
+    except Exception:
+        logger.exception("Could not open the analysis store")
+
+    # /health/ready keeps traffic away until the engines are up, so nothing
+    # else will ever retry the start: keep trying until it works or we shut
+    # down. pool.start_error tells the readiness probe why it is still failing.
+    delay = _START_RETRY_INITIAL
+    while True:
+        try:
+            await pool.start()
+            break
+        except Exception:
+            logger.exception("Could not start Stockfish engines; retrying in %.0fs", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _START_RETRY_MAX)
+
+    app.state.startup["readySeconds"] = round(time.perf_counter() - STARTED_AT, 3)
+    logger.info(
+        "Ready: imports %.2fs, engines warm %.2fs after start",
+        app.state.startup["importSeconds"],
+        app.state.startup["readySeconds"],
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.startup = {
+        "importSeconds": round(time.perf_counter() - STARTED_AT, 3),
+        "readySeconds": None,
+    }
+    pool = get_engine_pool()
+    # Engines start in the background: the process answers liveness checks at
+    # once, while /health/ready stays 503 until every engine is warm.
+    warm_up = asyncio.create_task(_warm_up(app, pool))
+    yield
+    warm_up.cancel()
+    await pool.close()
 
 
 def create_app() -> FastAPI:
     logging.basicConfig(level=logging.INFO)
 
-    app = FastAPI(title="ChessBlunder AI API")
+    app = FastAPI(title="ChessBlunder AI API", lifespan=lifespan)
     origins = ["*"]
 
     # CORS for local development.
@@ -5,6 +5,30 @@ class PGNIn(BaseModel):
     pgn: str = Field(..., min_length=1, description="PGN text pasted/typed by the user.")
 
 
+# Sized so one request finishes in about a minute at the default depth;
+# larger batches go through the work queue (POST /tasks/batch).
+MAX_BATCH_GAMES = 20
+MAX_TASK_BATCH_GAMES = 1000
+
+
+class PGNBatchIn(BaseModel):
+    pgns: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_GAMES,
+        description="Games to analyse together, one PGN each.",
+    )
+
+
+class PGNBatchTaskIn(BaseModel):
+    pgns: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_TASK_BATCH_GAMES,
+        description="Games for a worker to analyse together, one PGN each.",
+    )
+
+
 class PlyAnalysis(BaseModel):
     """Schema for a single ply (half-move) analysis."""
     ply: int
@@ -16,6 +40,8 @@ class PlyAnalysis(BaseModel):
     bestEval: dict | None
     centipawnLoss: int
     grade: str
+    phase: str = Field(..., description="opening, middlegame or endgame")
+    color: str = Field(..., description="white or black: the side that played the move")
     reason: str | None = Field(None, description="Human-readable explanation for poor moves")
 
 
@@ -27,6 +53,7 @@ class AnalysisResponse(BaseModel):
     finalFen: str
     finalEval: dict
     plies: list[PlyAnalysis]
+    stats: dict = Field(..., description="Per-colour accuracy, ACPL and grade counts, plus win-probability curve")
 
 
 class LearningInsightsRequest(BaseModel):
@@ -0,0 +1,191 @@
+"""
+Admission control in front of the engine pool: bounded per-lane queues,
+weighted fair sharing between lanes, and wait-time statistics.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from app.core.config import get_settings
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+# Recent waits kept per lane for percentile reporting.
+_WAIT_SAMPLES = 1_000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a lane's queue is full; `retry_after` is in whole seconds."""
+
+    def __init__(self, lane: str, retry_after: int) -> None:
+        super().__init__(f"{lane} queue is full")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class _Lane:
+    def __init__(self, name: str, weight: int, max_queue: int) -> None:
+        self.name = name
+        self.weight = weight
+        self.max_queue = max_queue
+        self.waiters: deque[asyncio.Future[None]] = deque()
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Stride-scheduling clock: advances by 1/weight per grant.
+        self.pass_value = 0.0
+        self.waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self.waits)
+        return {
+            "weight": self.weight,
+            "queued": len(self.waiters),
+            "maxQueue": self.max_queue,
+            "active": self.active,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "waitSeconds": {
+                "avg": sum(waits) / len(waits) if waits else 0.0,
+                "p50": waits[len(waits) // 2] if waits else 0.0,
+                "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
+
+
+class AdmissionController:
+    """
+    Hands out `capacity` execution slots (one per engine) across priority lanes.
+
+    Requests queue per lane up to that lane's bound and are rejected beyond it.
+    When a slot frees up it goes to the waiting lane with the lowest stride
+    pass value, so under contention each lane gets slots in proportion to its
+    weight and bulk traffic can't starve interactive users (or vice versa).
+    """
+
+    def __init__(self, capacity: int, lanes: dict[str, tuple[int, int]]) -> None:
+        self.capacity = capacity
+        self._lanes = {
+            name: _Lane(name, weight, max_queue) for name, (weight, max_queue) in lanes.items()
+        }
+        self._busy = 0
+        # Smoothed seconds a slot is held, used to estimate Retry-After.
+        self._service_seconds = 1.0
+
+    def _lane(self, name: str) -> _Lane:
+        try:
+            return self._lanes[name]
+        except KeyError:
+            raise ValueError(f"Unknown lane: {name!r}") from None
+
+    def _retry_after(self) -> int:
+        queued = sum(len(lane.waiters) for lane in self._lanes.values())
+        rounds = queued / max(self.capacity, 1) + 1
+        return max(1, math.ceil(rounds * self._service_seconds))
+
+    def _grant(self, lane: _Lane) -> None:
+        self._busy += 1
+        lane.active += 1
+        lane.admitted += 1
+        lane.pass_value += 1.0 / lane.weight
+
+    def _dispatch(self) -> None:
+        while self._busy < self.capacity:
+            waiting = [lane for lane in self._lanes.values() if lane.waiters]
+            if not waiting:
+                return
+            lane = min(waiting, key=lambda candidate: candidate.pass_value)
+            waiter = lane.waiters.popleft()
+            if waiter.done():
+                continue
+            self._grant(lane)
+            waiter.set_result(None)
+
+    def _release(self, lane: _Lane, held: float | None) -> None:
+        """Free a slot; `held` feeds the Retry-After estimate unless None."""
+        self._busy -= 1
+        lane.active -= 1
+        if held is not None:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, lane_name: str) -> AsyncIterator[None]:
+        """Hold one slot in `lane_name` for the duration of the block."""
+        lane = self._lane(lane_name)
+        queued_at = time.monotonic()
+
+        if self._busy < self.capacity and not any(other.waiters for other in self._lanes.values()):
+            self._catch_up(lane)
+            self._grant(lane)
+        else:
+            if len(lane.waiters) >= lane.max_queue:
+                lane.rejected += 1
+                raise AdmissionRejected(lane.name, self._retry_after())
+            if not lane.waiters:
+                self._catch_up(lane)
+            waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            lane.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as we were cancelled: hand the slot on. It was
+                    # never used, so it says nothing about service time.
+                    self._release(lane, None)
+                else:
+                    waiter.cancel()
+                    if waiter in lane.waiters:
+                        lane.waiters.remove(waiter)
+                raise
+
+        started = time.monotonic()
+        lane.waits.append(started - queued_at)
+        try:
+            yield
+        finally:
+            self._release(lane, time.monotonic() - started)
+
+    def _catch_up(self, lane: _Lane) -> None:
+        # A lane that was idle must not bank credit and then monopolise slots.
+        others = [
+            other.pass_value
+            for other in self._lanes.values()
+            if other is not lane and (other.waiters or other.active)
+        ]
+        if others:
+            lane.pass_value = max(lane.pass_value, min(others))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "busy": self._busy,
+            "lanes": {name: lane.stats() for name, lane in self._lanes.items()},
+        }
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller sized to the engine pool."""
+    global _controller
+    if _controller is None:
+        settings = get_settings()
+        _controller = AdmissionController(
+            settings.stockfish_pool_size,
+            {
+                INTERACTIVE: (settings.interactive_weight, settings.interactive_queue_size),
+                BATCH: (settings.batch_weight, settings.batch_queue_size),
+            },
+        )
+    return _controller
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import io
-import shutil
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from typing import Any
 
 import chess
 import chess.engine
 import chess.pgn
 
-from app.core.config import settings
+from app.core.config import get_settings
+from app.services.engine import SupervisedEngine, get_engine_pool
+from app.services.profiling import Profiler
 
 
 def _normalize_pgn_text(pgn_text: str) -> str:
@@ -45,20 +50,6 @@ def _normalize_pgn_text(pgn_text: str) -> str:
     return " ".join(text.split())
 
 
-def _resolve_stockfish_path() -> str:
-    # Prefer explicit env/config path
-    if settings.stockfish_path:
-        return settings.stockfish_path
-
-    # Try PATH
-    which = shutil.which("stockfish")
-    if which:
-        return which
-
-    # Common Debian/Ubuntu apt install location
-    return "/usr/games/stockfish"
-
-
 def _score_to_json(score: chess.engine.PovScore) -> dict[str, Any]:
     """
     Convert a python-chess score to JSON-friendly shape.
@@ -100,6 +91,22 @@ def _grade_from_centipawn_loss(loss: int, *, is_exact_best: bool) -> str:
     return "Blunder"
 
 
+def _game_phase(board: chess.Board, ply_idx: int) -> str:
+    """
+    Coarse game phase of the position a move is played from.
+    Endgame once at most 6 minor/major pieces remain, opening for the first 10 moves.
+    """
+    pieces = 0
+    for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+        pieces += len(board.pieces(piece_type, chess.WHITE))
+        pieces += len(board.pieces(piece_type, chess.BLACK))
+    if pieces <= 6:
+        return "endgame"
+    if ply_idx <= 20:
+        return "opening"
+    return "middlegame"
+
+
 def _get_piece_name(piece_type: int) -> str:
     """Convert chess piece type to readable name."""
     names = {
@@ -278,124 +285,198 @@ def _generate_move_explanation(
     return None
 
 
-def analyze_pgn(
-    pgn_text: str,
-    *,
-    depth: int | None = None,
-    max_plies: int | None = None,
-) -> dict[str, Any]:
+def _position_key(board: chess.Board) -> tuple[Any, ...]:
     """
-    Analyze a PGN using Stockfish and return basic per-ply evaluations.
+    Identity of a position as the engine sees it. Besides the board itself,
+    a search can only depend on the moves since the last capture or pawn
+    move (repetitions and the 50-move rule), so those are part of the key.
+    """
+    stack = board.move_stack
+    reversible = stack[len(stack) - board.halfmove_clock:] if board.halfmove_clock < len(stack) else stack
+    return (board.epd(), board.halfmove_clock, tuple(reversible))
 
-    - depth: Stockfish search depth (default: settings.stockfish_depth)
-    - max_plies: optionally limit number of half-moves analyzed (useful for very long games)
+
+class _Searches:
+    """
+    Engine results keyed by position, so a position is searched at most once
+    no matter how many plies (or games) reach it.
     """
-    depth = depth or settings.stockfish_depth
 
-    normalized_pgn = _normalize_pgn_text(pgn_text)
-    game = chess.pgn.read_game(io.StringIO(normalized_pgn))
+    def __init__(
+        self,
+        engine: SupervisedEngine,
+        limit: chess.engine.Limit,
+        profiler: Profiler | None = None,
+    ) -> None:
+        self.engine = engine
+        self.limit = limit
+        self.profiler = profiler
+        self._results: dict[tuple[Any, ...], chess.engine.InfoDict] = {}
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    async def get(
+        self,
+        board: chess.Board,
+        ply: int | None = None,
+        position: str = "",
+    ) -> chess.engine.InfoDict:
+        key = _position_key(board)
+        info = self._results.get(key)
+        if info is not None:
+            return info
+        if self.profiler is None:
+            info = await self.engine.analyse(board, self.limit)
+        else:
+            started = time.perf_counter()
+            info = await self.engine.analyse(board, self.limit)
+            self.profiler.record_search(ply, position, time.perf_counter() - started, info)
+        self._results[key] = info
+        return info
+
+
+def _read_game(pgn_text: str) -> chess.pgn.Game:
+    game = chess.pgn.read_game(io.StringIO(_normalize_pgn_text(pgn_text)))
     if game is None:
         raise ValueError("Could not parse PGN (no game found).")
+    return game
 
-    board = game.board()
-    stockfish_path = _resolve_stockfish_path()
 
+async def _analyze_game(
+    game: chess.pgn.Game,
+    searches: _Searches,
+    *,
+    max_plies: int | None,
+    profiler: Profiler | None = None,
+) -> tuple[list[dict[str, Any]], chess.Board, dict[str, Any]]:
+    """Per-ply results, final board and final eval for one parsed game."""
+    board = game.board()
     plies: list[dict[str, Any]] = []
 
-    # NOTE: This opens Stockfish per-request. For higher throughput, move this to
-    # app startup/shutdown and reuse a single engine instance.
-    with chess.engine.SimpleEngine.popen_uci(stockfish_path) as engine:
-        for ply_idx, move in enumerate(game.mainline_moves(), start=1):
-            # Analyze BEFORE the move so we can know what the engine wanted instead.
-            mover_is_white = board.turn == chess.WHITE
-
-            info_before = engine.analyse(board, chess.engine.Limit(depth=depth))
-            pv_before = info_before.get("pv") or []
-            best_move_to_play = pv_before[0] if pv_before else None
-
-            best_after_eval_json: dict[str, Any] | None = None
-            best_after_cp_like_mover: int | None = None
-            if best_move_to_play is not None:
-                best_board = board.copy()
-                best_board.push(best_move_to_play)
-                info_best_after = engine.analyse(best_board, chess.engine.Limit(depth=depth))
-                best_after_pov_white = info_best_after["score"].pov(chess.WHITE)
-                best_after_eval_json = _score_to_json(best_after_pov_white)
-
-                best_after_cp_like_white = _pov_to_cp_like(best_after_pov_white)
-                best_after_cp_like_mover = (
-                    best_after_cp_like_white if mover_is_white else -best_after_cp_like_white
-                )
-
-            # Apply player's move
-            san = board.san(move)
-            played_uci = move.uci()
-            board.push(move)
-
-            # Analyze AFTER the move (this is the eval you already returned)
-            info_after = engine.analyse(board, chess.engine.Limit(depth=depth))
-            played_after_pov_white = info_after["score"].pov(chess.WHITE)
-            played_after_eval_json = _score_to_json(played_after_pov_white)
-
-            played_after_cp_like_white = _pov_to_cp_like(played_after_pov_white)
-            played_after_cp_like_mover = (
-                played_after_cp_like_white if mover_is_white else -played_after_cp_like_white
-            )
-
-            # Also: best reply from the new position (useful for hinting next move).
-            pv_after = info_after.get("pv") or []
-            best_reply = pv_after[0].uci() if pv_after else None
-
-            is_exact_best = (
-                best_move_to_play is not None and played_uci == best_move_to_play.uci()
+    for ply_idx, move in enumerate(game.mainline_moves(), start=1):
+        # Analyze BEFORE the move so we can know what the engine wanted instead.
+        mover_is_white = board.turn == chess.WHITE
+        phase = _game_phase(board, ply_idx)
+
+        info_before = await searches.get(board, ply_idx, "before")
+        pv_before = info_before.get("pv") or []
+        best_move_to_play = pv_before[0] if pv_before else None
+
+        best_after_eval_json: dict[str, Any] | None = None
+        best_after_cp_like_mover: int | None = None
+        if best_move_to_play is not None:
+            # Push/pop rather than copy: a copy duplicates the whole move stack.
+            board.push(best_move_to_play)
+            try:
+                info_best_after = await searches.get(board, ply_idx, "bestAfter")
+            finally:
+                board.pop()
+            best_after_pov_white = info_best_after["score"].pov(chess.WHITE)
+            best_after_eval_json = _score_to_json(best_after_pov_white)
+
+            best_after_cp_like_white = _pov_to_cp_like(best_after_pov_white)
+            best_after_cp_like_mover = (
+                best_after_cp_like_white if mover_is_white else -best_after_cp_like_white
             )
 
-            # Centipawn loss from the mover's perspective.
-            # If we couldn't compute a best-after eval, default loss to 0.
-            loss = 0
-            if best_after_cp_like_mover is not None:
-                loss = max(0, int(best_after_cp_like_mover - played_after_cp_like_mover))
-
-            grade = _grade_from_centipawn_loss(loss, is_exact_best=is_exact_best)
-
-            # Generate explanation for poor moves
-            best_reply_obj = pv_after[0] if pv_after else None
-            reason = _generate_move_explanation(
-                board=board,
-                grade=grade,
-                best_reply_move=best_reply_obj,
-                eval_after=played_after_eval_json,
-                best_eval=best_after_eval_json,
-                mover_is_white=mover_is_white,
-                centipawn_loss=loss,
-            )
-
-            ply_data = {
-                "ply": ply_idx,
-                "uci": played_uci,
-                "san": san,
-                "eval": played_after_eval_json,
-                # Best move the engine wanted for the player who moved (from BEFORE the move)
-                "bestMove": best_move_to_play.uci() if best_move_to_play else None,
-                # Best reply for the opponent (from AFTER the move)
-                "bestReply": best_reply,
-                # Eval after the bestMove (optional, but useful for UI/explanations)
-                "bestEval": best_after_eval_json,
-                "centipawnLoss": loss,
-                "grade": grade,
-            }
-
-            # Add reason only if one was generated
-            if reason:
-                ply_data["reason"] = reason
-
-            plies.append(ply_data)
-
-            if max_plies is not None and ply_idx >= max_plies:
-                break
+        # Apply player's move
+        san = board.san(move)
+        played_uci = move.uci()
+        board.push(move)
+
+        # Analyze AFTER the move (this is the eval you already returned)
+        info_after = await searches.get(board, ply_idx, "after")
+        played_after_pov_white = info_after["score"].pov(chess.WHITE)
+        played_after_eval_json = _score_to_json(played_after_pov_white)
+
+        played_after_cp_like_white = _pov_to_cp_like(played_after_pov_white)
+        played_after_cp_like_mover = (
+            played_after_cp_like_white if mover_is_white else -played_after_cp_like_white
+        )
+
+        # Also: best reply from the new position (useful for hinting next move).
+        pv_after = info_after.get("pv") or []
+        best_reply = pv_after[0].uci() if pv_after else None
+
+        is_exact_best = (
+            best_move_to_play is not None and played_uci == best_move_to_play.uci()
+        )
+
+        # Centipawn loss from the mover's perspective.
+        # If we couldn't compute a best-after eval, default loss to 0.
+        loss = 0
+        if best_after_cp_like_mover is not None:
+            loss = max(0, int(best_after_cp_like_mover - played_after_cp_like_mover))
+
+        grade = _grade_from_centipawn_loss(loss, is_exact_best=is_exact_best)
+
+        # Generate explanation for poor moves
+        best_reply_obj = pv_after[0] if pv_after else None
+        if profiler is not None:
+            started = time.perf_counter()
+        reason = _generate_move_explanation(
+            board=board,
+            grade=grade,
+            best_reply_move=best_reply_obj,
+            eval_after=played_after_eval_json,
+            best_eval=best_after_eval_json,
+            mover_is_white=mover_is_white,
+            centipawn_loss=loss,
+        )
+        if profiler is not None:
+            profiler.add("explain", time.perf_counter() - started)
+
+        ply_data = {
+            "ply": ply_idx,
+            "uci": played_uci,
+            "san": san,
+            "eval": played_after_eval_json,
+            # Best move the engine wanted for the player who moved (from BEFORE the move)
+            "bestMove": best_move_to_play.uci() if best_move_to_play else None,
+            # Best reply for the opponent (from AFTER the move)
+            "bestReply": best_reply,
+            # Eval after the bestMove (optional, but useful for UI/explanations)
+            "bestEval": best_after_eval_json,
+            "centipawnLoss": loss,
+            "grade": grade,
+            "phase": phase,
+            # Recorded explicitly: FEN games may start with Black to move.
+            "color": "white" if mover_is_white else "black",
+        }
+
+        # Add reason only if one was generated
+        if reason:
+            ply_data["reason"] = reason
+
+        plies.append(ply_data)
+
+        if max_plies is not None and ply_idx >= max_plies:
+            break
+
+    final_info = await searches.get(board, None, "final")
+    final_eval = _score_to_json(final_info["score"].pov(chess.WHITE))
+    return plies, board, final_eval
+
+
+def _analysis_result(
+    game: chess.pgn.Game,
+    *,
+    depth: int,
+    stockfish_path: str,
+    board: chess.Board,
+    final_eval: dict[str, Any],
+    plies: list[dict[str, Any]],
+    profiler: Profiler | None = None,
+) -> dict[str, Any]:
+    # NumPy is only needed once a game has been analysed; keep it off the import path.
+    from app.services import stats
 
-        final_info = engine.analyse(board, chess.engine.Limit(depth=depth))
-        final_eval = _score_to_json(final_info["score"].pov(chess.WHITE))
+    if profiler is not None:
+        started = time.perf_counter()
+    game_stats = stats.game_stats(plies)
+    if profiler is not None:
+        profiler.add("stats", time.perf_counter() - started)
 
     headers = dict(game.headers) if game.headers else {}
     return {
@@ -405,6 +486,208 @@ def analyze_pgn(
         "finalFen": board.fen(),
         "finalEval": final_eval,
         "plies": plies,
+        "stats": game_stats,
     }
 
 
+async def analyze_pgn(
+    pgn_text: str,
+    *,
+    depth: int | None = None,
+    max_plies: int | None = None,
+    profiler: Profiler | None = None,
+) -> dict[str, Any]:
+    """
+    Analyze a PGN using Stockfish and return basic per-ply evaluations.
+
+    - depth: Stockfish search depth (default: settings.stockfish_depth)
+    - max_plies: optionally limit number of half-moves analyzed (useful for very long games)
+    - profiler: optionally collect stage timings and per-search engine stats
+    """
+    depth = depth or get_settings().stockfish_depth
+
+    if profiler is not None:
+        started = time.perf_counter()
+    game = _read_game(pgn_text)
+    if profiler is not None:
+        profiler.add("parse", time.perf_counter() - started)
+        started = time.perf_counter()
+
+    pool = get_engine_pool()
+
+    # Engines are long-lived and shared; this waits until one is free.
+    async with pool.acquire() as engine:
+        if profiler is not None:
+            profiler.add("engineWait", time.perf_counter() - started)
+        searches = _Searches(engine, chess.engine.Limit(depth=depth), profiler)
+        plies, board, final_eval = await _analyze_game(
+            game, searches, max_plies=max_plies, profiler=profiler
+        )
+
+    return _analysis_result(
+        game,
+        depth=depth,
+        stockfish_path=pool.path,
+        board=board,
+        final_eval=final_eval,
+        plies=plies,
+        profiler=profiler,
+    )
+
+
+# Positions the plan walk searches between forced yields to the event loop.
+_YIELD_EVERY = 64
+
+
+@dataclass
+class _PlanNode:
+    # (move, child key) for every move some game plays from here. Nodes hold
+    # no board: the search replays moves on one board instead.
+    children: list[tuple[chess.Move, tuple[Any, ...]]] = field(default_factory=list)
+    # Some game plays a move from here, so its best move's position is needed too.
+    moved_from: bool = False
+
+
+def _plan_positions(
+    games: list[chess.pgn.Game],
+    max_plies: int | None,
+) -> tuple[dict[tuple[Any, ...], _PlanNode], dict[tuple[Any, ...], chess.Board]]:
+    """
+    Merge the games' mainlines into one DAG of positions (keyed like the
+    search cache, so transpositions with the same history share a node).
+    Returns the nodes and the distinct starting positions with their boards.
+    """
+    nodes: dict[tuple[Any, ...], _PlanNode] = {}
+    roots: dict[tuple[Any, ...], chess.Board] = {}
+
+    for game in games:
+        board = game.board()
+        key = _position_key(board)
+        if key not in roots:
+            roots[key] = board.copy()
+        node = nodes.setdefault(key, _PlanNode())
+        for ply_idx, move in enumerate(game.mainline_moves(), start=1):
+            node.moved_from = True
+            board.push(move)
+            key = _position_key(board)
+            if (move, key) not in node.children:
+                node.children.append((move, key))
+            node = nodes.setdefault(key, _PlanNode())
+            if max_plies is not None and ply_idx >= max_plies:
+                break
+    return nodes, roots
+
+
+def _read_and_plan(
+    pgn_texts: list[str],
+    max_plies: int | None,
+) -> tuple[
+    list[chess.pgn.Game],
+    dict[tuple[Any, ...], _PlanNode],
+    dict[tuple[Any, ...], chess.Board],
+]:
+    """Parse every game and plan their positions; CPU-bound, run in a thread."""
+    games = []
+    for i, pgn_text in enumerate(pgn_texts, start=1):
+        try:
+            games.append(_read_game(pgn_text))
+        except ValueError as e:
+            raise ValueError(f"Game {i}: {e}") from e
+    nodes, roots = _plan_positions(games, max_plies)
+    return games, nodes, roots
+
+
+async def _search_plan(
+    nodes: dict[tuple[Any, ...], _PlanNode],
+    roots: dict[tuple[Any, ...], chess.Board],
+    searches: _Searches,
+    progress: Callable[[int, int], None] | None = None,
+) -> None:
+    """
+    Search every planned position depth-first, each parent's best-move
+    position right after it, so consecutive searches share most of their
+    tree and the engine's hash stays warm along common lines.
+
+    The walk replays moves on one board per root, pushing on the way down and
+    popping on the way back, so it costs one move per edge rather than a
+    board copy (and its move stack) per position.
+
+    `progress(done, total)` is called after each planned position.
+    """
+    seen: set[tuple[Any, ...]] = set()
+    for root_key, root_board in roots.items():
+        board = root_board.copy()
+        # (key, move that reaches it); a None key pops the move on the way back.
+        stack: list[tuple[tuple[Any, ...] | None, chess.Move | None]] = [(root_key, None)]
+        while stack:
+            key, move = stack.pop()
+            if key is None:
+                board.pop()
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            if move is not None:
+                board.push(move)
+                stack.append((None, move))
+            node = nodes[key]
+            info = await searches.get(board)
+            pv = info.get("pv") or []
+            if node.moved_from and pv:
+                board.push(pv[0])
+                await searches.get(board)
+                board.pop()
+            if progress is not None:
+                progress(len(seen), len(nodes))
+            stack.extend((child, move) for move, child in reversed(node.children))
+            if len(seen) % _YIELD_EVERY == 0:
+                # Cache hits never await the engine; let heartbeats run.
+                await asyncio.sleep(0)
+
+
+async def analyze_pgn_batch(
+    pgn_texts: list[str],
+    *,
+    depth: int | None = None,
+    max_plies: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Analyze many games on one engine, searching each distinct position once.
+
+    Games from the same repertoire share long opening lines; those positions
+    are planned into a DAG, searched once in depth-first order, and the
+    results fanned back out, so every game gets exactly the plies
+    `analyze_pgn` would produce for it from the same engine results.
+    `progress(done, total)` reports planned positions searched so far.
+    """
+    depth = depth or get_settings().stockfish_depth
+    # Parsing and planning a large batch takes seconds of CPU; keep it off the
+    # event loop so the API keeps serving and workers keep heartbeating.
+    games, nodes, roots = await asyncio.to_thread(_read_and_plan, pgn_texts, max_plies)
+    pool = get_engine_pool()
+
+    analyses = []
+    async with pool.acquire() as engine:
+        searches = _Searches(engine, chess.engine.Limit(depth=depth))
+        await _search_plan(nodes, roots, searches, progress)
+        for game in games:
+            # Every lookup hits the cache now; the engine is only a fallback.
+            plies, board, final_eval = await _analyze_game(game, searches, max_plies=max_plies)
+            analyses.append(_analysis_result(
+                game,
+                depth=depth,
+                stockfish_path=pool.path,
+                board=board,
+                final_eval=final_eval,
+                plies=plies,
+            ))
+            # All cache hits, so nothing above yields; do it once per game.
+            await asyncio.sleep(0)
+
+    return {
+        "games": analyses,
+        "plies": sum(len(analysis["plies"]) for analysis in analyses),
+        "positions": len(nodes),
+        "searches": len(searches),
+    }
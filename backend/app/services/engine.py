@@ -0,0 +1,279 @@
+"""
+Pool of long-lived Stockfish processes driven through python-chess's asyncio API.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import shutil
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import chess.engine
+
+from app.core.config import get_settings
+
+logger = logging.getLogger("chessblunder-api")
+
+# Middlegame position ("Kiwipete") searched once per engine at startup so the
+# binary, NNUE weights and hash are loaded before real traffic arrives.
+WARMUP_FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+def resolve_stockfish_path() -> str:
+    # Prefer explicit env/config path
+    settings = get_settings()
+    if settings.stockfish_path:
+        return settings.stockfish_path
+
+    # Try PATH
+    which = shutil.which("stockfish")
+    if which:
+        return which
+
+    # Common Debian/Ubuntu apt install location
+    return "/usr/games/stockfish"
+
+
+class SupervisedEngine:
+    """
+    One Stockfish process plus the logic to keep it usable.
+
+    Every search runs under a timeout. If the process has died, the search
+    times out (a hung engine) or the engine reports a protocol failure, the
+    process is killed and respawned and the same position is searched again,
+    up to `max_retries` times. Callers keep whatever they computed before
+    the failure; only the failed search is repeated.
+    """
+
+    def __init__(self, path: str, *, search_timeout: float, max_retries: int) -> None:
+        self.path = path
+        self.search_timeout = search_timeout
+        self.max_retries = max_retries
+        self._transport: asyncio.SubprocessTransport | None = None
+        self._protocol: chess.engine.UciProtocol | None = None
+        # Counters surfaced through EnginePool.stats().
+        self.restarts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._protocol is not None and not self._protocol.returncode.done()
+
+    async def start(self, *, warmup_depth: int = 0) -> None:
+        """
+        Spawn the process and, optionally, run a warm-up search. Both run
+        under `search_timeout`, so an engine that never finishes its UCI
+        handshake raises TimeoutError instead of blocking its callers.
+        """
+        try:
+            # On cancellation popen_uci closes the transport, killing the process.
+            self._transport, self._protocol = await asyncio.wait_for(
+                chess.engine.popen_uci(self.path), timeout=self.search_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error("Stockfish at %s did not complete the UCI handshake", self.path)
+            raise
+        if warmup_depth:
+            await self._search(chess.Board(WARMUP_FEN), chess.engine.Limit(depth=warmup_depth))
+
+    def _kill(self) -> None:
+        if self._transport is not None:
+            if self.alive:
+                try:
+                    self._transport.kill()
+                except ProcessLookupError:
+                    pass
+            self._transport.close()
+        self._transport = None
+        self._protocol = None
+
+    async def close(self) -> None:
+        if self._protocol is not None and self.alive:
+            try:
+                await asyncio.wait_for(self._protocol.quit(), timeout=2.0)
+            except Exception:
+                pass
+        self._kill()
+
+    async def _restart(self) -> None:
+        # A TimeoutError or crash here surfaces through _search, so analyse()
+        # counts it and retries like any other failed search.
+        self.restarts += 1
+        self._kill()
+        await self.start()
+
+    async def analyse(
+        self,
+        board: chess.Board,
+        limit: chess.engine.Limit,
+    ) -> chess.engine.InfoDict:
+        """`UciProtocol.analyse` with timeout, crash detection and retry."""
+        attempt = 0
+        while True:
+            try:
+                return await self._search(board, limit)
+            except asyncio.TimeoutError as e:
+                self.timeouts += 1
+                error: Exception = e
+                reason = f"no result within {self.search_timeout}s"
+            except (chess.engine.EngineTerminatedError, chess.engine.EngineError, OSError) as e:
+                self.crashes += 1
+                error = e
+                reason = f"{type(e).__name__}: {e}"
+
+            # The process is dead or can't be trusted to answer; replace it.
+            self._kill()
+            if attempt >= self.max_retries:
+                logger.error("Stockfish failed on %s (%s); giving up", board.fen(), reason)
+                raise error
+            attempt += 1
+            self.retries += 1
+            logger.warning(
+                "Stockfish failed on %s (%s); restarting and retrying (%d/%d)",
+                board.fen(),
+                reason,
+                attempt,
+                self.max_retries,
+            )
+
+    async def _search(
+        self,
+        board: chess.Board,
+        limit: chess.engine.Limit,
+    ) -> chess.engine.InfoDict:
+        if not self.alive:
+            await self._restart()
+        assert self._protocol is not None
+        search = asyncio.ensure_future(self._protocol.analyse(board, limit))
+        try:
+            done, _ = await asyncio.wait({search}, timeout=self.search_timeout)
+        except asyncio.CancelledError:
+            # Caller gave up (e.g. client disconnected): python-chess sends `stop`.
+            search.cancel()
+            raise
+        if search in done:
+            return search.result()
+
+        # Hung. Kill the process first and let the search fail with
+        # EngineTerminatedError; cancelling it instead would send `stop` to an
+        # engine that will never answer.
+        self._kill()
+        try:
+            await asyncio.wait_for(search, timeout=5.0)
+        except Exception:
+            pass
+        raise asyncio.TimeoutError()
+
+
+class EnginePool:
+    """
+    Fixed set of supervised UCI engines shared by all requests.
+
+    Each analysis checks out one engine for its whole game, so the number of
+    concurrent searches is bounded by `size` rather than by a thread pool;
+    further callers simply await a free engine.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        *,
+        warmup_depth: int = 0,
+        search_timeout: float = 30.0,
+        max_retries: int = 2,
+    ) -> None:
+        self.path = path
+        self.size = size
+        self.warmup_depth = warmup_depth
+        self.start_error: str | None = None
+        self._engines = [
+            SupervisedEngine(path, search_timeout=search_timeout, max_retries=max_retries)
+            for _ in range(size)
+        ]
+        self._idle: asyncio.Queue[SupervisedEngine] = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    async def start(self) -> None:
+        """
+        Spawn and warm all engines. Safe to call repeatedly; raises if the
+        binary is missing.
+        """
+        async with self._start_lock:
+            if self._started:
+                return
+            try:
+                await asyncio.gather(
+                    *(engine.start(warmup_depth=self.warmup_depth) for engine in self._engines)
+                )
+            except Exception as e:
+                self.start_error = f"{type(e).__name__}: {e}"
+                for engine in self._engines:
+                    await engine.close()
+                raise
+            for engine in self._engines:
+                self._idle.put_nowait(engine)
+            self._started = True
+            self.start_error = None
+            logger.info("Started %d Stockfish engine(s) at %s", self.size, self.path)
+
+    async def close(self) -> None:
+        async with self._start_lock:
+            while not self._idle.empty():
+                self._idle.get_nowait()
+            for engine in self._engines:
+                await engine.close()
+            self._started = False
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[SupervisedEngine]:
+        """Check out an engine, waiting for one to become free."""
+        await self.start()
+        engine = await self._idle.get()
+        try:
+            yield engine
+        finally:
+            # Engines restart themselves on their next search if they died.
+            self._idle.put_nowait(engine)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": self.idle,
+            "alive": sum(engine.alive for engine in self._engines),
+            "restarts": sum(engine.restarts for engine in self._engines),
+            "retries": sum(engine.retries for engine in self._engines),
+            "timeouts": sum(engine.timeouts for engine in self._engines),
+            "crashes": sum(engine.crashes for engine in self._engines),
+        }
+
+
+_pool: EnginePool | None = None
+
+
+def get_engine_pool() -> EnginePool:
+    """Process-wide engine pool, created on first use."""
+    global _pool
+    if _pool is None:
+        settings = get_settings()
+        _pool = EnginePool(
+            resolve_stockfish_path(),
+            settings.stockfish_pool_size,
+            warmup_depth=settings.stockfish_warmup_depth,
+            search_timeout=settings.stockfish_search_timeout,
+            max_retries=settings.stockfish_max_retries,
+        )
+    return _pool
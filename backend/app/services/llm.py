@@ -2,9 +2,8 @@
 LLM service for generating chess learning insights using OpenAI.
 """
 from typing import Any
-from groq import Groq
 
-from app.core.config import settings
+from app.core.config import get_settings
 
 
 def _format_move_for_llm(ply_data: dict[str, Any], move_number: int, is_white: bool) -> str:
@@ -141,7 +140,7 @@ def _build_llm_prompt(
     return "\n".join(prompt_parts)
 
 
-def generate_learning_insights(
+async def generate_learning_insights(
     plies: list[dict[str, Any]],
     player_color: str,
     game_headers: dict[str, Any] | None = None,
@@ -192,33 +191,35 @@ def generate_learning_insights(
     # Call OpenAI API
     try:
         # Get API key from environment or settings
-        api_key = settings.groq_api_key
+        api_key = get_settings().groq_api_key
         if not api_key:
             raise ValueError("Groq API key not configured. Set GROQ_API_KEY environment variable.")
-        
-        client = Groq(
+
+        # Imported here so the SDK doesn't slow startup of analysis-only deployments.
+        from groq import AsyncGroq
+
+        async with AsyncGroq(
             api_key=api_key,
             max_retries=2,  # Limit retries to avoid long waits
             timeout=30.0,  # 30 second timeout
-        )
-        
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Using GPT-4o-mini for cost-effectiveness
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert chess coach providing constructive, educational analysis of games. "
-                              "Your goal is to help players improve by identifying patterns in their mistakes and "
-                              "providing actionable advice."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=500,
-        )
+        ) as client:
+            response = await client.chat.completions.create(
+                model="llama-3.3-70b-versatile",  # Using GPT-4o-mini for cost-effectiveness
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are an expert chess coach providing constructive, educational analysis of games. "
+                                  "Your goal is to help players improve by identifying patterns in their mistakes and "
+                                  "providing actionable advice."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.7,
+                max_tokens=500,
+            )
         
         insights = response.choices[0].message.content
         
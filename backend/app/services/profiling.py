@@ -0,0 +1,116 @@
+"""
+Opt-in per-request profiling of the analysis pipeline.
+
+Code paths take a `profiler: Profiler | None` and only touch the clock when
+one is passed, so unprofiled requests pay nothing beyond an `is None` check.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import chess.engine
+
+# Stages reported in pipeline order; anything else recorded is appended after.
+STAGES = ("admission", "parse", "engineWait", "search", "explain", "stats", "serialize")
+
+
+def _weighted_nps(searches: list[dict[str, Any]]) -> int | None:
+    """Engine-reported NPS averaged over `searches`, weighted by their nodes."""
+    weighted = [
+        (search["nodes"], search["nps"])
+        for search in searches
+        if search["nodes"] and search["nps"]
+    ]
+    total_nodes = sum(nodes for nodes, _ in weighted)
+    if not total_nodes:
+        return None
+    return int(sum(nodes * nps for nodes, nps in weighted) / total_nodes)
+
+
+class Profiler:
+    """Accumulates stage wall times and per-search engine statistics for one request."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._stages: dict[str, float] = {}
+        self._searches: list[dict[str, Any]] = []
+
+    def add(self, stage: str, seconds: float) -> None:
+        self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def record_search(
+        self,
+        ply: int | None,
+        position: str,
+        seconds: float,
+        info: chess.engine.InfoDict,
+    ) -> None:
+        """
+        One engine search. `ply` is None for the final position; `position`
+        says which board of the ply was searched (before, bestAfter, after).
+        """
+        self.add("search", seconds)
+        self._searches.append({
+            "ply": ply,
+            "position": position,
+            "seconds": seconds,
+            "depth": info.get("depth"),
+            "seldepth": info.get("seldepth"),
+            "nodes": info.get("nodes"),
+            "nps": info.get("nps"),
+        })
+
+    def report(self, plies: list[dict[str, Any]], *, slowest: int = 5) -> dict[str, Any]:
+        """
+        JSON breakdown: stage times, per-ply search totals (summed over the
+        ply's searches, max depth/seldepth) and the `slowest` plies.
+
+        `nps` is the engine's own figure from its `info` output, weighted by
+        nodes; `wallNps` is nodes over wall time measured here, which also
+        counts process round-trips and is only comparable between runs.
+        """
+        by_ply: dict[int, dict[str, Any]] = {}
+        searches_by_ply: dict[int, list[dict[str, Any]]] = {}
+        san = {ply["ply"]: ply["san"] for ply in plies}
+        for search in self._searches:
+            if search["ply"] is None:
+                continue
+            entry = by_ply.setdefault(search["ply"], {
+                "ply": search["ply"],
+                "san": san.get(search["ply"]),
+                "searches": 0,
+                "seconds": 0.0,
+                "depth": 0,
+                "seldepth": 0,
+                "nodes": 0,
+            })
+            searches_by_ply.setdefault(search["ply"], []).append(search)
+            entry["searches"] += 1
+            entry["seconds"] += search["seconds"]
+            entry["depth"] = max(entry["depth"], search["depth"] or 0)
+            entry["seldepth"] = max(entry["seldepth"], search["seldepth"] or 0)
+            entry["nodes"] += search["nodes"] or 0
+
+        per_ply = sorted(by_ply.values(), key=lambda entry: entry["ply"])
+        for entry in per_ply:
+            entry["nps"] = _weighted_nps(searches_by_ply[entry["ply"]])
+            entry["wallNps"] = int(entry["nodes"] / entry["seconds"]) if entry["seconds"] else None
+            entry["seconds"] = round(entry["seconds"], 4)
+
+        ordered = [stage for stage in STAGES if stage in self._stages]
+        ordered += [stage for stage in self._stages if stage not in STAGES]
+        total_nodes = sum(search["nodes"] or 0 for search in self._searches)
+        search_seconds = self._stages.get("search", 0.0)
+        return {
+            "totalSeconds": round(time.perf_counter() - self.started, 4),
+            "stages": {stage: round(self._stages[stage], 4) for stage in ordered},
+            "engine": {
+                "searches": len(self._searches),
+                "nodes": total_nodes,
+                "nps": _weighted_nps(self._searches),
+                "wallNps": int(total_nodes / search_seconds) if search_seconds else None,
+            },
+            "plies": per_ply,
+            "slowestPlies": sorted(per_ply, key=lambda entry: entry["seconds"], reverse=True)[:slowest],
+        }
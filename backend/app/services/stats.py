@@ -0,0 +1,284 @@
+"""
+Vectorized game statistics (win probability, accuracy, ACPL, grade histograms).
+
+Ply evaluations for any number of games are flattened into NumPy arrays once,
+then every metric is computed with array operations instead of per-ply loops.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+GRADES = ("Best", "Excellent", "Good", "Inaccuracy", "Mistake", "Blunder")
+PHASES = ("opening", "middlegame", "endgame")
+COLORS = ("white", "black")
+
+# Mate scores are mapped onto a large cp value; win probability saturates long before it.
+MATE_CP = 10_000
+# Lichess clamps evals to +-1000cp before converting to win probability.
+_WP_CP_CLAMP = 1_000
+_WP_SLOPE = 0.00368208
+# Eval assumed before White's first move when no best-move eval is available.
+_INITIAL_CP = 15
+
+_GRADE_INDEX = {grade: i for i, grade in enumerate(GRADES)}
+_PHASE_INDEX = {phase: i for i, phase in enumerate(PHASES)}
+
+# Per-ply columns and their dtypes: what `from_columns` takes for each game.
+COLUMNS: dict[str, type[np.generic]] = {
+    "is_white": np.bool_,
+    "eval_cp": np.float64,
+    "best_cp": np.float64,
+    "cp_loss": np.float64,
+    "grade": np.int8,
+    "phase": np.int8,
+}
+
+
+@dataclass(frozen=True)
+class PlyArrays:
+    """
+    Column arrays for the plies of one or more games.
+
+    Evals are in centipawns from White's point of view, with mates mapped to
+    +-MATE_CP. `best_cp` is NaN where no best-move eval was available.
+    """
+
+    n_games: int
+    game: np.ndarray  # int32: index of the game each ply belongs to
+    is_white: np.ndarray  # bool: ply was played by White
+    eval_cp: np.ndarray  # float64: eval after the played move
+    best_cp: np.ndarray  # float64: eval after the engine's best move
+    cp_loss: np.ndarray  # float64: centipawn loss reported by the analysis
+    grade: np.ndarray  # int8: index into GRADES, -1 if unknown
+    phase: np.ndarray  # int8: index into PHASES
+
+    @property
+    def side(self) -> np.ndarray:
+        """0 for White's plies, 1 for Black's."""
+        return (~self.is_white).astype(np.int64)
+
+    @classmethod
+    def from_games(cls, games: Sequence[Sequence[dict[str, Any]]]) -> PlyArrays:
+        """
+        Flatten `analyze_pgn` ply lists (one list per game) into arrays.
+
+        This is the expensive step: about 1.2 us per ply to read the dicts,
+        against about 0.1 us per ply for every metric computed afterwards.
+        For games already flattened once, keep their `columns()` and load
+        them with `from_columns`.
+        """
+        game_idx: list[int] = []
+        ply_no: list[int] = []
+        white: list[bool] = []
+        eval_is_mate: list[bool] = []
+        eval_value: list[float] = []
+        best_is_mate: list[bool] = []
+        best_value: list[float] = []
+        cp_loss: list[float] = []
+        grade: list[int] = []
+        phase: list[int] = []
+
+        for g, plies in enumerate(games):
+            for ply in plies:
+                n = int(ply["ply"])
+                game_idx.append(g)
+                ply_no.append(n)
+                # FEN games may start with Black; parity only for plies without a colour.
+                white.append(ply.get("color", "white" if n % 2 else "black") == "white")
+
+                ev = ply.get("eval") or {}
+                eval_is_mate.append(ev.get("type") == "mate")
+                eval_value.append(ev.get("value") or 0)
+
+                best = ply.get("bestEval")
+                if best is None:
+                    best_is_mate.append(False)
+                    best_value.append(np.nan)
+                else:
+                    best_is_mate.append(best.get("type") == "mate")
+                    best_value.append(best.get("value") or 0)
+
+                cp_loss.append(ply.get("centipawnLoss") or 0)
+                grade.append(_GRADE_INDEX.get(ply.get("grade", ""), -1))
+                # Plies stored before phases existed fall back to a ply-count split.
+                phase.append(_PHASE_INDEX.get(ply.get("phase", ""), 0 if n <= 20 else 1))
+
+        is_white = np.asarray(white, dtype=bool)
+        return cls(
+            n_games=len(games),
+            game=np.asarray(game_idx, dtype=np.int32),
+            is_white=is_white,
+            eval_cp=_to_cp(np.asarray(eval_is_mate), np.asarray(eval_value, dtype=np.float64), is_white),
+            best_cp=_to_cp(np.asarray(best_is_mate), np.asarray(best_value, dtype=np.float64), is_white),
+            cp_loss=np.asarray(cp_loss, dtype=np.float64),
+            grade=np.asarray(grade, dtype=np.int8),
+            phase=np.asarray(phase, dtype=np.int8),
+        )
+
+
+    @classmethod
+    def from_columns(cls, games: Sequence[Mapping[str, np.ndarray]]) -> PlyArrays:
+        """
+        Concatenate per-game `columns()` (e.g. read back with `np.frombuffer`).
+        Costs a copy per column, with no per-ply Python work.
+        """
+        lengths = [len(columns["cp_loss"]) for columns in games]
+        concatenated = {
+            name: np.concatenate([columns[name] for columns in games]).astype(dtype, copy=False)
+            if games else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        return cls(
+            n_games=len(games),
+            game=np.repeat(np.arange(len(games), dtype=np.int32), lengths),
+            **concatenated,
+        )
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """The per-ply columns named in COLUMNS, without the game index."""
+        return {name: getattr(self, name) for name in COLUMNS}
+
+
+def _to_cp(is_mate: np.ndarray, value: np.ndarray, is_white: np.ndarray) -> np.ndarray:
+    """
+    Map JSON evals (White POV) to cp. "mate 0" means the mover just delivered
+    mate, so its sign comes from who moved.
+    """
+    mover_sign = np.where(is_white, 1.0, -1.0)
+    mate_sign = np.where(value == 0, mover_sign, np.sign(value))
+    return np.where(is_mate, mate_sign * MATE_CP, value)
+
+
+def win_probability(cp: np.ndarray) -> np.ndarray:
+    """Lichess win probability (0-100) for a cp eval from the same side's POV."""
+    clamped = np.clip(cp, -_WP_CP_CLAMP, _WP_CP_CLAMP)
+    return 50.0 + 50.0 * (2.0 / (1.0 + np.exp(-_WP_SLOPE * clamped)) - 1.0)
+
+
+def win_probability_curve(arrays: PlyArrays) -> np.ndarray:
+    """White's win probability after every ply."""
+    return win_probability(arrays.eval_cp)
+
+
+def _eval_before(arrays: PlyArrays) -> np.ndarray:
+    """
+    White-POV eval the mover could have reached: the best-move eval when known,
+    otherwise the eval after the previous ply of the same game.
+    """
+    previous = np.empty_like(arrays.eval_cp)
+    previous[0:1] = _INITIAL_CP
+    previous[1:] = arrays.eval_cp[:-1]
+    first_of_game = np.ones(len(arrays.game), dtype=bool)
+    first_of_game[1:] = arrays.game[1:] != arrays.game[:-1]
+    previous[first_of_game] = _INITIAL_CP
+    return np.where(np.isnan(arrays.best_cp), previous, arrays.best_cp)
+
+
+def move_accuracy(arrays: PlyArrays) -> np.ndarray:
+    """Lichess-style accuracy (0-100) of every move, from the win-probability drop."""
+    sign = np.where(arrays.is_white, 1.0, -1.0)
+    wp_before = win_probability(sign * _eval_before(arrays))
+    wp_after = win_probability(sign * arrays.eval_cp)
+    drop = np.maximum(wp_before - wp_after, 0.0)
+    return np.clip(103.1668 * np.exp(-0.04354 * drop) - 3.1669, 0.0, 100.0)
+
+
+def _per_side_mean(values: np.ndarray, key: np.ndarray, bins: int) -> np.ndarray:
+    totals = np.bincount(key, weights=values, minlength=bins)
+    counts = np.bincount(key, minlength=bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / counts
+
+
+def side_stats(arrays: PlyArrays) -> dict[str, np.ndarray]:
+    """
+    Per game and colour aggregates; every array is indexed [game, side].
+
+    - moves: move count
+    - acpl: average centipawn loss
+    - acplByPhase: [game, side, phase] ACPL (NaN where the side made no moves)
+    - accuracy: mean of the arithmetic and harmonic means of move accuracy
+    - grades: [game, side, grade] histogram over GRADES
+    """
+    n = arrays.n_games
+    side_key = arrays.game.astype(np.int64) * 2 + arrays.side
+
+    moves = np.bincount(side_key, minlength=n * 2)
+    acpl = _per_side_mean(arrays.cp_loss, side_key, n * 2)
+
+    phase_key = side_key * len(PHASES) + arrays.phase
+    acpl_by_phase = _per_side_mean(arrays.cp_loss, phase_key, n * 2 * len(PHASES))
+
+    accuracy = move_accuracy(arrays)
+    arithmetic = _per_side_mean(accuracy, side_key, n * 2)
+    # Floor at 1% so a single zero-accuracy move doesn't zero the harmonic mean.
+    harmonic = 1.0 / _per_side_mean(1.0 / np.maximum(accuracy, 1.0), side_key, n * 2)
+
+    known = arrays.grade >= 0
+    grade_key = side_key[known] * len(GRADES) + arrays.grade[known]
+    grades = np.bincount(grade_key, minlength=n * 2 * len(GRADES))
+
+    return {
+        "moves": moves.reshape(n, 2),
+        "acpl": acpl.reshape(n, 2),
+        "acplByPhase": acpl_by_phase.reshape(n, 2, len(PHASES)),
+        "accuracy": ((arithmetic + harmonic) / 2.0).reshape(n, 2),
+        "grades": grades.reshape(n, 2, len(GRADES)),
+    }
+
+
+def phase_totals(arrays: PlyArrays) -> dict[str, np.ndarray]:
+    """
+    Per game, colour and phase sums; arrays are indexed [game, side, phase].
+
+    - moves: move count
+    - cpLoss: total centipawn loss
+    - grades: [game, side, phase, grade] histogram over GRADES
+    """
+    n = arrays.n_games
+    bins = n * 2 * len(PHASES)
+    key = (arrays.game.astype(np.int64) * 2 + arrays.side) * len(PHASES) + arrays.phase
+
+    known = arrays.grade >= 0
+    grade_key = key[known] * len(GRADES) + arrays.grade[known]
+    return {
+        "moves": np.bincount(key, minlength=bins).reshape(n, 2, len(PHASES)),
+        "cpLoss": np.bincount(key, weights=arrays.cp_loss, minlength=bins).reshape(
+            n, 2, len(PHASES)
+        ),
+        "grades": np.bincount(grade_key, minlength=bins * len(GRADES)).reshape(
+            n, 2, len(PHASES), len(GRADES)
+        ),
+    }
+
+
+def _json_float(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 1)
+
+
+def game_stats(plies: list[dict[str, Any]]) -> dict[str, Any]:
+    """JSON summary of one game's plies, as attached to `/pgn` results."""
+    arrays = PlyArrays.from_games([plies])
+    stats = side_stats(arrays)
+
+    summary: dict[str, Any] = {}
+    for side, color in enumerate(COLORS):
+        summary[color] = {
+            "moves": int(stats["moves"][0, side]),
+            "accuracy": _json_float(stats["accuracy"][0, side]),
+            "acpl": _json_float(stats["acpl"][0, side]),
+            "acplByPhase": {
+                phase: _json_float(stats["acplByPhase"][0, side, i])
+                for i, phase in enumerate(PHASES)
+            },
+            "grades": {
+                grade: int(stats["grades"][0, side, i]) for i, grade in enumerate(GRADES)
+            },
+        }
+
+    summary["winProbability"] = np.round(win_probability_curve(arrays), 1).tolist()
+    return summary
@@ -0,0 +1,586 @@
+"""
+Persistent SQLite store for analysed games, plies and per-player aggregates.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections.abc import Iterable, Sequence
+from itertools import repeat
+from typing import Any
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.stats import COLUMNS, GRADES, PHASES, PlyArrays, phase_totals, side_stats
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    white TEXT COLLATE NOCASE,
+    black TEXT COLLATE NOCASE,
+    date TEXT,
+    eco TEXT,
+    opening TEXT,
+    result TEXT,
+    depth INTEGER,
+    ply_count INTEGER NOT NULL,
+    final_fen TEXT,
+    headers TEXT NOT NULL,
+    -- Caller-chosen identity (e.g. the work-queue task) that makes saves idempotent.
+    save_key TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- One row per (game, colour): the per-player aggregates every history query starts from.
+CREATE TABLE IF NOT EXISTS game_sides (
+    game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    color TEXT NOT NULL,
+    player TEXT COLLATE NOCASE,
+    date TEXT,
+    -- The game's date, or the day it was stored when the PGN has none.
+    sort_date TEXT,
+    eco TEXT,
+    opening TEXT,
+    score REAL,
+    moves INTEGER NOT NULL,
+    cp_loss_total INTEGER NOT NULL,
+    acpl REAL,
+    blunders INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    inaccuracies INTEGER NOT NULL,
+    PRIMARY KEY (game_id, color)
+) WITHOUT ROWID;
+
+-- Per (game, colour, phase) totals, so phase queries never scan plies.
+CREATE TABLE IF NOT EXISTS game_side_phases (
+    game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    color TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    player TEXT COLLATE NOCASE,
+    date TEXT,
+    moves INTEGER NOT NULL,
+    cp_loss_total INTEGER NOT NULL,
+    blunders INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    inaccuracies INTEGER NOT NULL,
+    PRIMARY KEY (game_id, color, phase)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS plies (
+    game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    ply INTEGER NOT NULL,
+    color TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    san TEXT NOT NULL,
+    uci TEXT NOT NULL,
+    eval_type TEXT,
+    eval_value INTEGER,
+    best_move TEXT,
+    cp_loss INTEGER NOT NULL,
+    grade TEXT NOT NULL,
+    reason TEXT,
+    PRIMARY KEY (game_id, ply)
+) WITHOUT ROWID;
+
+-- Each game's per-ply stats columns (see `stats.COLUMNS`), one BLOB per column,
+-- so history queries load arrays with np.frombuffer instead of ply rows.
+CREATE TABLE IF NOT EXISTS game_arrays (
+    game_id INTEGER PRIMARY KEY REFERENCES games(id) ON DELETE CASCADE,
+    is_white BLOB NOT NULL,
+    eval_cp BLOB NOT NULL,
+    best_cp BLOB NOT NULL,
+    cp_loss BLOB NOT NULL,
+    grade BLOB NOT NULL,
+    phase BLOB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_games_white ON games (white, date);
+CREATE INDEX IF NOT EXISTS idx_games_black ON games (black, date);
+CREATE INDEX IF NOT EXISTS idx_games_date ON games (date);
+CREATE INDEX IF NOT EXISTS idx_games_eco ON games (eco);
+DROP INDEX IF EXISTS idx_sides_player_date;
+DROP INDEX IF EXISTS idx_sides_player_eco;
+-- Covers the worst-openings summary, grouped in index order.
+CREATE INDEX IF NOT EXISTS idx_sides_player_openings ON game_sides
+    (player, eco, opening, color, moves, cp_loss_total, blunders, score);
+CREATE INDEX IF NOT EXISTS idx_plies_grade ON plies (grade, game_id);
+-- Covers the all-games phase summary without touching the table.
+CREATE INDEX IF NOT EXISTS idx_side_phases_player ON game_side_phases
+    (player, phase, moves, cp_loss_total, blunders, mistakes, inaccuracies);
+"""
+
+# Indexes on columns that stores created before them gain in `_migrate`.
+_MIGRATED_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_sides_player_recent ON game_sides (player, sort_date, game_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_games_save_key ON games (save_key);
+"""
+
+# Fills game_side_phases for games stored before the table existed.
+_BACKFILL_PHASES = """
+INSERT INTO game_side_phases
+SELECT p.game_id, p.color, p.phase, s.player, s.date, COUNT(*), SUM(p.cp_loss),
+       SUM(p.grade = 'Blunder'), SUM(p.grade = 'Mistake'), SUM(p.grade = 'Inaccuracy')
+FROM plies p
+JOIN game_sides s ON s.game_id = p.game_id AND s.color = p.color
+WHERE p.game_id IN (
+    SELECT id FROM games WHERE id NOT IN (SELECT game_id FROM game_side_phases)
+)
+GROUP BY p.game_id, p.color, p.phase
+"""
+
+
+def _normalize_date(value: str | None) -> str | None:
+    """
+    PGN dates look like "2024.01.15" and may be partially unknown ("2024.??.??").
+    Store ISO dates so they sort correctly; unknown parts make the date NULL.
+    """
+    if not value:
+        return None
+    parts = value.strip().split(".")
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
+    return "-".join(parts)
+
+
+def _score_for(result: str | None, color: str) -> float | None:
+    """Game score (1 / 0.5 / 0) from the given colour's point of view."""
+    white_score = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}.get(result or "")
+    if white_score is None:
+        return None
+    return white_score if color == "white" else 1.0 - white_score
+
+
+def _ply_colors(analysis: dict[str, Any]) -> list[str]:
+    """
+    The side that played each ply. Analyses produced before the mover was
+    recorded fall back to ply parity, starting from the side to move in the
+    game's FEN header (White unless the game was set up with Black to move).
+    """
+    plies = analysis.get("plies") or []
+    fen = (analysis.get("headers") or {}).get("FEN") or ""
+    fen_fields = fen.split()
+    first = "black" if len(fen_fields) > 1 and fen_fields[1] == "b" else "white"
+    second = "black" if first == "white" else "white"
+    return [
+        ply.get("color") or (first if int(ply["ply"]) % 2 == 1 else second)
+        for ply in plies
+    ]
+
+
+# Games per `_fill_arrays` call, well under SQLite's bound-parameter limit.
+_FILL_CHUNK = 500
+
+_ERROR_GRADES = [GRADES.index(grade) for grade in ("Blunder", "Mistake", "Inaccuracy")]
+
+
+def _game_arrays(plies: list[dict[str, Any]], colors: list[str]) -> PlyArrays:
+    """Stats columns for one game, with each ply's mover taken from `colors`."""
+    if any(ply.get("color") != color for ply, color in zip(plies, colors)):
+        plies = [{**ply, "color": color} for ply, color in zip(plies, colors)]
+    return PlyArrays.from_games([plies])
+
+
+def _array_row(game_id: int, arrays: PlyArrays) -> tuple[Any, ...]:
+    return (game_id, *(column.tobytes() for column in arrays.columns().values()))
+
+
+def _rounded(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 1)
+
+
+def _fallback_phase(ply: int) -> str:
+    # Analyses produced before phases were recorded only know the ply number.
+    return "opening" if ply <= 20 else "middlegame"
+
+
+class AnalysisStore:
+    """
+    Embedded store for analysis results.
+
+    A single connection is shared behind a lock; SQLite queries on the indexed
+    aggregate tables are fast enough that callers don't need a pool.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            self._migrate()
+            self._conn.execute(_BACKFILL_PHASES)
+        self._conn.executescript(_MIGRATED_INDEXES)
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a store was created."""
+        game_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(games)")}
+        if "save_key" not in game_columns:
+            self._conn.execute("ALTER TABLE games ADD COLUMN save_key TEXT")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(game_sides)")}
+        if "sort_date" not in columns:
+            self._conn.execute("ALTER TABLE game_sides ADD COLUMN sort_date TEXT")
+            self._conn.execute(
+                "UPDATE game_sides SET sort_date = COALESCE(date,"
+                " (SELECT date(created_at) FROM games WHERE games.id = game_sides.game_id))"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def save_analysis(self, analysis: dict[str, Any], *, key: str | None = None) -> int:
+        """Persist one `analyze_pgn` result and return its game id."""
+        return self.save_analyses([analysis], keys=None if key is None else [key])[0]
+
+    def save_analyses(
+        self,
+        analyses: Iterable[dict[str, Any]],
+        *,
+        keys: Sequence[str] | None = None,
+    ) -> list[int]:
+        """
+        Bulk-insert `analyze_pgn` results in a single transaction.
+        Returns the game ids in input order.
+
+        With `keys`, saving is idempotent: an analysis whose key is already
+        stored is skipped and the existing game id returned, so a retried
+        work-queue task doesn't store its games twice.
+        """
+        key_iter: Iterable[str | None] = keys if keys is not None else repeat(None)
+        game_ids: list[int] = []
+        side_rows: list[tuple[Any, ...]] = []
+        phase_rows: list[tuple[Any, ...]] = []
+        array_rows: list[tuple[Any, ...]] = []
+        ply_rows: list[tuple[Any, ...]] = []
+
+        with self._lock, self._conn:
+            for analysis, key in zip(analyses, key_iter):
+                if key is not None:
+                    existing = self._conn.execute(
+                        "SELECT id FROM games WHERE save_key = ?", (key,)
+                    ).fetchone()
+                    if existing is not None:
+                        game_ids.append(int(existing["id"]))
+                        continue
+                headers = analysis.get("headers") or {}
+                plies = analysis.get("plies") or []
+                colors = _ply_colors(analysis)
+                date = _normalize_date(headers.get("Date") or headers.get("UTCDate"))
+                eco = headers.get("ECO")
+                opening = headers.get("Opening")
+                result = headers.get("Result")
+
+                cursor = self._conn.execute(
+                    "INSERT INTO games (white, black, date, eco, opening, result, depth,"
+                    " ply_count, final_fen, headers, save_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        headers.get("White"),
+                        headers.get("Black"),
+                        date,
+                        eco,
+                        opening,
+                        result,
+                        analysis.get("depth"),
+                        len(plies),
+                        analysis.get("finalFen"),
+                        json.dumps(headers),
+                        key,
+                    ),
+                )
+                game_id = int(cursor.lastrowid)
+                game_ids.append(game_id)
+
+                arrays = _game_arrays(plies, colors)
+                array_rows.append(_array_row(game_id, arrays))
+                # [side, phase] sums; whole-game side totals add up the phases.
+                totals = phase_totals(arrays)
+                moves = totals["moves"][0]
+                cp_loss = np.rint(totals["cpLoss"][0]).astype(np.int64)
+                errors = totals["grades"][0][..., _ERROR_GRADES]
+
+                for side, color in enumerate(("white", "black")):
+                    player = headers.get("White" if color == "white" else "Black")
+                    side_moves = int(moves[side].sum())
+                    side_loss = int(cp_loss[side].sum())
+                    side_rows.append((
+                        game_id,
+                        color,
+                        player,
+                        date,
+                        date,
+                        eco,
+                        opening,
+                        _score_for(result, color),
+                        side_moves,
+                        side_loss,
+                        side_loss / side_moves if side_moves else None,
+                        *(int(count) for count in errors[side].sum(axis=0)),
+                    ))
+                    phase_rows.extend(
+                        (
+                            game_id,
+                            color,
+                            phase,
+                            player,
+                            date,
+                            int(moves[side, i]),
+                            int(cp_loss[side, i]),
+                            *(int(count) for count in errors[side, i]),
+                        )
+                        for i, phase in enumerate(PHASES)
+                        if moves[side, i]
+                    )
+
+                for ply, color in zip(plies, colors):
+                    ply_no = int(ply["ply"])
+                    eval_json = ply.get("eval") or {}
+                    ply_rows.append((
+                        game_id,
+                        ply_no,
+                        color,
+                        ply.get("phase") or _fallback_phase(ply_no),
+                        ply["san"],
+                        ply["uci"],
+                        eval_json.get("type"),
+                        eval_json.get("value"),
+                        ply.get("bestMove"),
+                        int(ply.get("centipawnLoss") or 0),
+                        ply.get("grade", ""),
+                        ply.get("reason"),
+                    ))
+
+            self._conn.executemany(
+                "INSERT INTO game_sides (game_id, color, player, date, sort_date, eco, opening,"
+                " score, moves, cp_loss_total, acpl, blunders, mistakes, inaccuracies)"
+                " VALUES (?, ?, ?, ?, COALESCE(?, date('now')), ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                side_rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO game_side_phases (game_id, color, phase, player, date, moves,"
+                " cp_loss_total, blunders, mistakes, inaccuracies)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                phase_rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO game_arrays (game_id, is_white, eval_cp, best_cp, cp_loss, grade,"
+                " phase) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                array_rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO plies (game_id, ply, color, phase, san, uci, eval_type, eval_value,"
+                " best_move, cp_loss, grade, reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ply_rows,
+            )
+
+        return game_ids
+
+    def _query(self, sql: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def acpl_trend(self, player: str, *, limit: int = 200) -> dict[str, Any]:
+        """
+        ACPL of the player's most recent `limit` games, oldest first, plus the
+        overall average across them. Undated games count from the day stored.
+        """
+        games = self._query(
+            """
+            SELECT game_id AS gameId, date, color, acpl, moves,
+                   blunders, mistakes, inaccuracies, score
+            FROM game_sides
+            WHERE player = ? AND moves > 0
+            ORDER BY sort_date DESC, game_id DESC
+            LIMIT ?
+            """,
+            (player, limit),
+        )
+        games.reverse()
+        total_moves = sum(game["moves"] for game in games)
+        total_loss = sum(game["acpl"] * game["moves"] for game in games)
+        return {
+            "player": player,
+            "games": games,
+            "acpl": total_loss / total_moves if total_moves else None,
+        }
+
+    def blunder_rate_by_phase(self, player: str, *, limit: int | None = None) -> list[dict[str, Any]]:
+        """
+        Per-phase move count, ACPL and blunder/mistake/inaccuracy rates for the
+        player's moves, optionally restricted to their most recent `limit` games.
+        """
+        if limit is None:
+            source = "SELECT * FROM game_side_phases WHERE player = ?"
+            params: tuple[Any, ...] = (player,)
+        else:
+            source = """
+                SELECT p.* FROM (
+                    SELECT game_id, color FROM game_sides
+                    WHERE player = ?
+                    ORDER BY sort_date DESC, game_id DESC
+                    LIMIT ?
+                ) r
+                JOIN game_side_phases p ON p.game_id = r.game_id AND p.color = r.color
+            """
+            params = (player, limit)
+        return self._query(
+            f"""
+            SELECT phase,
+                   SUM(moves) AS moves,
+                   SUM(cp_loss_total) * 1.0 / SUM(moves) AS acpl,
+                   SUM(blunders) * 1.0 / SUM(moves) AS blunderRate,
+                   SUM(mistakes) * 1.0 / SUM(moves) AS mistakeRate,
+                   SUM(inaccuracies) * 1.0 / SUM(moves) AS inaccuracyRate
+            FROM ({source})
+            GROUP BY phase
+            ORDER BY CASE phase
+                WHEN 'opening' THEN 0 WHEN 'middlegame' THEN 1 ELSE 2 END
+            """,
+            params,
+        )
+
+    def player_accuracy(self, player: str, *, limit: int | None = None) -> dict[str, Any]:
+        """
+        Accuracy and ACPL for each of the player's games (the most recent
+        `limit`, or all), oldest first, plus totals across them. Loads each
+        game's stored column arrays, so no ply rows are read.
+        """
+        recent = """
+            SELECT game_id, color, date, sort_date FROM game_sides
+            WHERE player = ? AND moves > 0
+            ORDER BY sort_date DESC, game_id DESC
+        """
+        params: tuple[Any, ...] = (player,)
+        if limit is not None:
+            recent += " LIMIT ?"
+            params = (player, limit)
+
+        missing = self._query(
+            f"SELECT r.game_id FROM ({recent}) r"
+            " WHERE NOT EXISTS (SELECT 1 FROM game_arrays a WHERE a.game_id = r.game_id)",
+            params,
+        )
+        missing_ids = [row["game_id"] for row in missing]
+        for start in range(0, len(missing_ids), _FILL_CHUNK):
+            self._fill_arrays(missing_ids[start:start + _FILL_CHUNK])
+
+        rows = self._query(
+            f"""
+            SELECT r.game_id, r.color, r.date, {", ".join(f"a.{name}" for name in COLUMNS)}
+            FROM ({recent}) r JOIN game_arrays a ON a.game_id = r.game_id
+            ORDER BY r.sort_date, r.game_id
+            """,
+            params,
+        )
+        arrays = PlyArrays.from_columns([
+            {name: np.frombuffer(row[name], dtype) for name, dtype in COLUMNS.items()}
+            for row in rows
+        ])
+        stats = side_stats(arrays)
+        games = np.arange(len(rows))
+        sides = np.array([row["color"] == "black" for row in rows], dtype=np.int64)
+        moves = stats["moves"][games, sides]
+        acpl = stats["acpl"][games, sides]
+        accuracy = stats["accuracy"][games, sides]
+
+        total_moves = int(moves.sum())
+        return {
+            "player": player,
+            "games": [
+                {
+                    "gameId": row["game_id"],
+                    "date": row["date"],
+                    "color": row["color"],
+                    "moves": int(moves[i]),
+                    "accuracy": _rounded(accuracy[i]),
+                    "acpl": _rounded(acpl[i]),
+                }
+                for i, row in enumerate(rows)
+            ],
+            "accuracy": _rounded(accuracy.mean()) if rows else None,
+            "acpl": _rounded((acpl * moves).sum() / total_moves) if total_moves else None,
+        }
+
+    def _fill_arrays(self, game_ids: list[int]) -> None:
+        """
+        Build column arrays for games stored before they were kept, from their
+        ply rows. Best-move evals weren't stored, so accuracy for these games
+        measures each move against the previous eval instead.
+        """
+        placeholders = ", ".join("?" * len(game_ids))
+        rows = self._query(
+            "SELECT game_id, ply, color, phase, eval_type, eval_value, cp_loss, grade"
+            f" FROM plies WHERE game_id IN ({placeholders}) ORDER BY game_id, ply",
+            tuple(game_ids),
+        )
+        plies_by_game: dict[int, list[dict[str, Any]]] = {game_id: [] for game_id in game_ids}
+        for row in rows:
+            plies_by_game[row["game_id"]].append({
+                "ply": row["ply"],
+                "color": row["color"],
+                "phase": row["phase"],
+                "eval": {"type": row["eval_type"], "value": row["eval_value"]},
+                "bestEval": None,
+                "centipawnLoss": row["cp_loss"],
+                "grade": row["grade"],
+            })
+        array_rows = [
+            _array_row(game_id, PlyArrays.from_games([plies]))
+            for game_id, plies in plies_by_game.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO game_arrays (game_id, is_white, eval_cp, best_cp, cp_loss,"
+                " grade, phase) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                array_rows,
+            )
+
+    def worst_openings(
+        self,
+        player: str,
+        *,
+        min_games: int = 3,
+        limit: int = 10,
+    ) -> list[dict[str, Any]]:
+        """
+        Openings the player has at least `min_games` games in, worst ACPL first.
+        """
+        return self._query(
+            """
+            SELECT eco, opening, color,
+                   COUNT(*) AS games,
+                   SUM(cp_loss_total) * 1.0 / NULLIF(SUM(moves), 0) AS acpl,
+                   SUM(blunders) * 1.0 / NULLIF(SUM(moves), 0) AS blunderRate,
+                   AVG(score) AS score
+            FROM game_sides
+            WHERE player = ? AND eco IS NOT NULL
+            GROUP BY eco, opening, color
+            HAVING COUNT(*) >= ?
+            ORDER BY acpl DESC
+            LIMIT ?
+            """,
+            (player, min_games, limit),
+        )
+
+
+_store: AnalysisStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> AnalysisStore | None:
+    """Process-wide store, or None when `ANALYSIS_DB_PATH` isn't configured."""
+    global _store
+    settings = get_settings()
+    if not settings.analysis_db_path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = AnalysisStore(settings.analysis_db_path)
+    return _store
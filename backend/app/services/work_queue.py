@@ -0,0 +1,244 @@
+"""
+Shared work queue for analysis tasks, backed by a SQLite file.
+
+API processes enqueue tasks; worker processes (`python -m app.worker`) claim
+them under a time-limited lease, heartbeat while working and write results
+back. A task whose lease runs out (worker crashed or hung) is handed to the
+next claimant until it exhausts its attempts. Everything using one queue file
+runs on the host that holds it.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import get_settings
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Task kinds understood by `app.worker`.
+ANALYZE_PGN = "analyze_pgn"
+ANALYZE_PGN_BATCH = "analyze_pgn_batch"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    progress TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks (status, lease_expires);
+"""
+
+
+@dataclass(frozen=True)
+class Task:
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+
+
+class WorkQueue:
+    """
+    Lease-based task queue. Every method opens its own short transaction, so
+    any number of processes on the host can share one queue file.
+    """
+
+    def __init__(self, path: str, *, max_attempts: int = 3) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Queue files created before progress reporting lack the column.
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}
+            if "progress" not in columns:
+                conn.execute("ALTER TABLE tasks ADD COLUMN progress TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode; claim() opens its transaction with BEGIN IMMEDIATE
+        # so two workers can't read the same pending row before either updates it.
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, kind: str, payload: dict[str, Any]) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO tasks (kind, payload, status, max_attempts, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), PENDING, self.max_attempts, now, now),
+            )
+            return int(cursor.lastrowid)
+
+    def claim(self, worker: str, *, lease_seconds: float) -> Task | None:
+        """
+        Lease the oldest runnable task: pending, or leased with an expired lease.
+        Expired tasks that already used all their attempts are failed instead.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "UPDATE tasks SET status = ?, error = 'Lease expired on final attempt',"
+                    " worker = NULL, lease_expires = NULL, updated_at = ?"
+                    " WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                    (FAILED, now, LEASED, now),
+                )
+                row = conn.execute(
+                    "SELECT id, kind, payload, attempts FROM tasks"
+                    " WHERE status = ? OR (status = ? AND lease_expires < ?)"
+                    " ORDER BY id LIMIT 1",
+                    (PENDING, LEASED, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE tasks SET status = ?, worker = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (LEASED, worker, now + lease_seconds, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+        return Task(
+            id=row["id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"] + 1,
+        )
+
+    def _update_owned(
+        self,
+        task_id: int,
+        worker: str,
+        assignments: str,
+        params: tuple[Any, ...],
+    ) -> bool:
+        """Apply an update only while `worker` still holds the lease."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET {assignments}, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = ?",
+                (*params, time.time(), task_id, worker, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(
+        self,
+        task_id: int,
+        worker: str,
+        *,
+        lease_seconds: float,
+        progress: dict[str, Any] | None = None,
+    ) -> bool:
+        """
+        Extend the lease, recording `progress` if given. False means the lease
+        was lost and the work should be abandoned.
+        """
+        if progress is None:
+            return self._update_owned(
+                task_id, worker, "lease_expires = ?", (time.time() + lease_seconds,)
+            )
+        return self._update_owned(
+            task_id,
+            worker,
+            "lease_expires = ?, progress = ?",
+            (time.time() + lease_seconds, json.dumps(progress)),
+        )
+
+    def complete(self, task_id: int, worker: str, result: dict[str, Any]) -> bool:
+        return self._update_owned(
+            task_id,
+            worker,
+            "status = ?, result = ?, error = NULL, worker = NULL, lease_expires = NULL",
+            (DONE, json.dumps(result)),
+        )
+
+    def fail(self, task_id: int, worker: str, error: str, *, retry: bool) -> bool:
+        """
+        Record a failure. Retryable failures go back to pending while attempts
+        remain; everything else is final.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET"
+                " status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END,"
+                " error = ?, worker = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = ?",
+                (retry, PENDING, FAILED, error, time.time(), task_id, worker, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, task_id: int) -> dict[str, Any] | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, attempts, worker, result, progress, error,"
+                " created_at, updated_at FROM tasks WHERE id = ?",
+                (task_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "worker": row["worker"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
+
+    def counts(self) -> dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update({status: n for status, n in rows})
+        return counts
+
+
+_queue: WorkQueue | None = None
+
+
+def get_work_queue() -> WorkQueue | None:
+    """Process-wide queue, or None when `WORK_QUEUE_PATH` isn't configured."""
+    global _queue
+    settings = get_settings()
+    if not settings.work_queue_path:
+        return None
+    if _queue is None:
+        _queue = WorkQueue(settings.work_queue_path, max_attempts=settings.work_max_attempts)
+    return _queue
@@ -0,0 +1,206 @@
+"""
+Standalone analysis worker.
+
+Pulls tasks from the work queue, runs them on this process's Stockfish pool
+and writes results back. The queue is a SQLite file on local disk, so the API
+and every worker run on the host that holds it; start as many workers there
+as the host has cores for engines:
+
+    python -m app.worker --queue /var/lib/chessblunder/work.db
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Any
+
+from app.core.config import get_settings
+from app.services.analysis import analyze_pgn, analyze_pgn_batch
+from app.services.engine import get_engine_pool
+from app.services.store import get_store
+from app.services.work_queue import ANALYZE_PGN, ANALYZE_PGN_BATCH, Task, WorkQueue
+
+logger = logging.getLogger("chessblunder-worker")
+
+
+async def _run_task(task: Task, progress: dict[str, Any]) -> dict[str, Any]:
+    """Run one task; long tasks update `progress`, which heartbeats report."""
+    if task.kind == ANALYZE_PGN:
+        analysis = await analyze_pgn(
+            task.payload["pgn"],
+            depth=task.payload.get("depth"),
+            max_plies=task.payload.get("maxPlies"),
+        )
+        store = await asyncio.to_thread(get_store)
+        if store is not None:
+            analysis["gameId"] = await asyncio.to_thread(
+                store.save_analysis, analysis, key=f"task:{task.id}"
+            )
+        return analysis
+
+    if task.kind == ANALYZE_PGN_BATCH:
+        def report(done: int, total: int) -> None:
+            progress.update(positionsDone=done, positions=total)
+
+        batch = await analyze_pgn_batch(
+            task.payload["pgns"],
+            depth=task.payload.get("depth"),
+            max_plies=task.payload.get("maxPlies"),
+            progress=report,
+        )
+        store = await asyncio.to_thread(get_store)
+        if store is not None:
+            # Keyed by task, so a retry after a lost lease reuses the stored games.
+            keys = [f"task:{task.id}:{i}" for i in range(len(batch["games"]))]
+            game_ids = await asyncio.to_thread(store.save_analyses, batch["games"], keys=keys)
+            for analysis, game_id in zip(batch["games"], game_ids):
+                analysis["gameId"] = game_id
+        return batch
+
+    raise ValueError(f"Unknown task kind: {task.kind}")
+
+
+class Worker:
+    """
+    Runs `concurrency` claim/analyse/report loops against one queue.
+
+    Each claimed task is heartbeated every third of its lease; if a heartbeat
+    finds the lease gone (it expired and another worker took over), the local
+    run is cancelled rather than racing the new owner.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        *,
+        worker_id: str,
+        concurrency: int,
+        lease_seconds: float,
+        poll_interval: float,
+    ) -> None:
+        self.queue = queue
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming new tasks; in-flight tasks are allowed to finish."""
+        self._stopping.set()
+
+    async def _heartbeat(
+        self,
+        task: Task,
+        run: asyncio.Task[Any],
+        lost: asyncio.Event,
+        progress: dict[str, Any],
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            held = await asyncio.to_thread(
+                self.queue.heartbeat,
+                task.id,
+                self.worker_id,
+                lease_seconds=self.lease_seconds,
+                progress=dict(progress) if progress else None,
+            )
+            if not held:
+                logger.warning("Lost lease on task %d; abandoning it", task.id)
+                lost.set()
+                run.cancel()
+                return
+
+    async def _process(self, task: Task) -> None:
+        logger.info("Task %d: attempt %d", task.id, task.attempts)
+        progress: dict[str, Any] = {}
+        run = asyncio.create_task(_run_task(task, progress))
+        lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(task, run, lost, progress))
+        try:
+            result = await run
+        except asyncio.CancelledError:
+            if lost.is_set():
+                return  # the new lease holder reports the outcome
+            raise
+        except ValueError as e:
+            # Bad input won't get better on another attempt.
+            await asyncio.to_thread(self.queue.fail, task.id, self.worker_id, str(e), retry=False)
+            logger.info("Task %d failed: %s", task.id, e)
+            return
+        except Exception as e:
+            logger.exception("Task %d failed", task.id)
+            await asyncio.to_thread(self.queue.fail, task.id, self.worker_id, str(e), retry=True)
+            return
+        finally:
+            heartbeat.cancel()
+
+        if not await asyncio.to_thread(self.queue.complete, task.id, self.worker_id, result):
+            logger.warning("Task %d finished after its lease was lost; result discarded", task.id)
+        else:
+            logger.info("Task %d done", task.id)
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            task = await asyncio.to_thread(
+                self.queue.claim, self.worker_id, lease_seconds=self.lease_seconds
+            )
+            if task is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(task)
+
+    async def run(self) -> None:
+        pool = get_engine_pool()
+        await pool.start()
+        logger.info(
+            "Worker %s polling %s with %d loop(s)",
+            self.worker_id,
+            self.queue.path,
+            self.concurrency,
+        )
+        try:
+            await asyncio.gather(*(self._loop() for _ in range(self.concurrency)))
+        finally:
+            await pool.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="ChessBlunder AI analysis worker")
+    parser.add_argument("--queue", default=settings.work_queue_path, help="Work queue SQLite file")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument("--lease-seconds", type=float, default=settings.work_lease_seconds)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    args = parser.parse_args(argv)
+    if not args.queue:
+        parser.error("--queue or WORK_QUEUE_PATH is required")
+
+    logging.basicConfig(level=logging.INFO)
+    worker = Worker(
+        WorkQueue(args.queue, max_attempts=settings.work_max_attempts),
+        worker_id=args.worker_id,
+        # One loop per engine keeps the whole pool busy.
+        concurrency=settings.stockfish_pool_size,
+        lease_seconds=args.lease_seconds,
+        poll_interval=args.poll_interval,
+    )
+
+    async def serve() -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Stand-in UCI engine for local harnesses; point STOCKFISH_PATH at this file.
+
+Plays a legal move chosen deterministically from the position and reports a
+pseudo-random but stable score, so repeated runs give identical analyses.
+FAKE_UCI_DELAY (seconds per `go`, default 0) simulates search time.
+FAKE_UCI_CRASH_RATE / FAKE_UCI_HANG_RATE (probability per `go`, default 0)
+make the process exit or stop responding mid-search, for supervision tests.
+FAKE_UCI_SEED makes those failures reproducible: each draw depends on the
+seed, the position and how many searches this process has run, so a run
+fails at the same points every time while a restarted process retrying the
+failed position draws afresh.
+"""
+import os
+import random
+import sys
+import time
+import zlib
+
+import chess
+
+DELAY = float(os.environ.get("FAKE_UCI_DELAY", "0"))
+CRASH_RATE = float(os.environ.get("FAKE_UCI_CRASH_RATE", "0"))
+HANG_RATE = float(os.environ.get("FAKE_UCI_HANG_RATE", "0"))
+SEED = os.environ.get("FAKE_UCI_SEED")
+
+
+def _send(line: str) -> None:
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def main() -> None:
+    board = chess.Board()
+    searches = 0
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        cmd = parts[0]
+        if cmd == "uci":
+            _send("id name FakeUCI")
+            _send("uciok")
+        elif cmd == "isready":
+            _send("readyok")
+        elif cmd == "ucinewgame":
+            board = chess.Board()
+        elif cmd == "position":
+            moves_at = parts.index("moves") if "moves" in parts else len(parts)
+            if parts[1] == "startpos":
+                board = chess.Board()
+            else:
+                board = chess.Board(" ".join(parts[2:moves_at]))
+            for uci in parts[moves_at + 1:]:
+                board.push_uci(uci)
+        elif cmd == "go":
+            searches += 1
+            rng = random if SEED is None else random.Random(f"{SEED}:{searches}:{board.epd()}")
+            if CRASH_RATE and rng.random() < CRASH_RATE:
+                os._exit(1)
+            if HANG_RATE and rng.random() < HANG_RATE:
+                while True:
+                    time.sleep(3600)
+            if DELAY:
+                time.sleep(DELAY)
+            moves = sorted(board.legal_moves, key=lambda move: move.uci())
+            if not moves:
+                _send("info depth 0 score mate 0" if board.is_checkmate() else "info depth 0 score cp 0")
+                _send("bestmove (none)")
+                continue
+            # Like a real engine, ignore the move counters.
+            seed = zlib.crc32(board.epd().encode())
+            move = moves[seed % len(moves)]
+            score = seed % 301 - 150
+            _send(
+                f"info depth 12 seldepth 16 multipv 1 score cp {score} nodes 150000 nps 1500000"
+                f" time 100 pv {move.uci()}"
+            )
+            _send(f"bestmove {move.uci()}")
+        elif cmd == "quit":
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP load test for the API.
+
+Runs the FastAPI app in-process under uvicorn, with the stand-in UCI engine
+and a fake Groq-compatible LLM server, and drives a mixed `/pgn` and
+`/learning-insights` workload at increasing request rates. Arrivals are
+open-loop (Poisson at the target rate), so a slow server shows up as
+latency and errors rather than as a politely slower client.
+
+Each step reports throughput, p50/p95/p99 latency, error rates and a
+/metrics snapshot. The first step that misses its rate, its p99 target or
+its error budget is the saturation point. Results are written as JSON for
+regression tracking.
+
+    cd backend && python scripts/loadtest.py --rps 2,4,8,16 --duration 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FAKE_ENGINE = Path(__file__).resolve().parent / "fake_uci_engine.py"
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+PGN = "pgn"
+INSIGHTS = "insights"
+
+GAMES = [
+    '[White "Alice"]\n[Black "Bob"]\n[Result "1-0"]\n\n'
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O"
+    " 9. h3 Nb8 10. d4 Nbd7 11. c4 c6 12. cxb5 axb5 13. Nc3 Bb7 14. Bg5 b4 15. Nb1 h6 1-0",
+    '[White "Carol"]\n[Black "Dave"]\n[Result "0-1"]\n\n'
+    "1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3 e5 7. Nb3 Be6 8. f3 Be7"
+    " 9. Qd2 O-O 10. O-O-O Nbd7 11. g4 b5 12. g5 b4 13. Ne2 Ne8 14. f4 a5 0-1",
+    '[White "Erin"]\n[Black "Frank"]\n[Result "1/2-1/2"]\n\n'
+    "1. d4 Nf6 2. c4 e6 3. Nc3 Bb4 4. e3 O-O 5. Bd3 d5 6. Nf3 c5 7. O-O Nc6 8. a3 Bxc3"
+    " 9. bxc3 dxc4 10. Bxc4 Qc7 11. Bd3 e5 12. Qc2 Re8 1/2-1/2",
+    '[White "Grace"]\n[Black "Heidi"]\n[Result "1-0"]\n\n'
+    "1. e4 e6 2. d4 d5 3. Nc3 Bb4 4. e5 c5 5. a3 Bxc3+ 6. bxc3 Ne7 7. Qg4 Qc7 8. Qxg7 Rg8"
+    " 9. Qxh7 cxd4 10. Ne2 Nbc6 11. f4 dxc3 1-0",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _fake_llm_app(latency: float, error_rate: float, seed: int) -> FastAPI:
+    """Just enough of the Groq (OpenAI-style) chat completions API."""
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.calls = 0
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.calls += 1
+        body = await request.json()
+        await asyncio.sleep(latency)
+        if rng.random() < error_rate:
+            return JSONResponse({"error": {"message": "Injected failure"}}, status_code=500)
+        return {
+            "id": f"chatcmpl-fake-{app.state.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": "1. Check every capture before moving.\n2. Develop before attacking.",
+                },
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 300, "completion_tokens": 20, "total_tokens": 320},
+        }
+
+    return app
+
+
+class _ServerThread:
+    """A uvicorn server on its own thread and event loop."""
+
+    def __init__(self, app: Any, port: int) -> None:
+        self.port = port
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 30.0) -> None:
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+def _percentiles(values: list[float]) -> dict[str, float | None]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    values = sorted(values)
+
+    def at(q: float) -> float:
+        return round(values[min(len(values) - 1, int(len(values) * q))], 4)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(values[-1], 4)}
+
+
+def _summarize(results: list[dict[str, Any]], elapsed: float) -> dict[str, Any]:
+    ok = [result for result in results if result["error"] is None]
+    errors: dict[str, int] = {}
+    for result in results:
+        if result["error"] is not None:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "throughputRps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "errorRate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "latencySeconds": _percentiles([result["latency"] for result in ok]),
+    }
+
+
+async def _request(
+    client: httpx.AsyncClient,
+    kind: str,
+    payload: dict[str, Any],
+    lane: str,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    error = None
+    try:
+        if kind == PGN:
+            response = await client.post("/pgn", json=payload, headers={"X-Analysis-Lane": lane})
+        else:
+            response = await client.post("/learning-insights", json=payload)
+        if response.status_code != 200:
+            error = str(response.status_code)
+        elif kind == INSIGHTS and response.json()["data"].get("error"):
+            # The endpoint degrades to a canned answer when the LLM call fails.
+            error = "llm"
+    except httpx.TimeoutException:
+        error = "timeout"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return {"kind": kind, "latency": time.perf_counter() - started, "error": error}
+
+
+async def _run_step(
+    client: httpx.AsyncClient,
+    rps: float,
+    args: argparse.Namespace,
+    payloads: dict[str, list[dict[str, Any]]],
+    rng: random.Random,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    in_flight: list[asyncio.Task[dict[str, Any]]] = []
+    # Schedule from the step's start rather than from the last send, so a
+    # stalled event loop can't quietly lower the offered rate.
+    due = 0.0
+    while True:
+        due += rng.expovariate(rps)
+        if due >= args.duration:
+            break
+        delay = started + due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = INSIGHTS if rng.random() < args.insights_share else PGN
+        in_flight.append(asyncio.create_task(
+            _request(client, kind, rng.choice(payloads[kind]), args.lane)
+        ))
+    results = await asyncio.gather(*in_flight)
+    elapsed = max(args.duration, time.perf_counter() - started)
+
+    metrics = (await client.get("/metrics")).json()["data"]
+    # Poisson arrivals scatter around the target; judge throughput against
+    # what was actually sent.
+    sent_rps = len(results) / args.duration
+    step = {
+        "offeredRps": rps,
+        "sentRps": round(sent_rps, 3),
+        "durationSeconds": round(elapsed, 3),
+        **_summarize(results, elapsed),
+        "byKind": {
+            kind: _summarize([result for result in results if result["kind"] == kind], elapsed)
+            for kind in (PGN, INSIGHTS)
+        },
+        "metrics": metrics,
+    }
+
+    reasons = []
+    if step["throughputRps"] < sent_rps * args.min_throughput:
+        reasons.append(f"throughput {step['throughputRps']} < {args.min_throughput:.0%} of {step['sentRps']} sent")
+    p99 = step["latencySeconds"]["p99"]
+    if p99 is not None and p99 > args.p99_slo:
+        reasons.append(f"p99 {p99}s > {args.p99_slo}s")
+    if step["errorRate"] > args.max_error_rate:
+        reasons.append(f"error rate {step['errorRate']} > {args.max_error_rate}")
+    step["saturated"] = bool(reasons)
+    step["saturationReasons"] = reasons
+    return step
+
+
+async def _warm_up(client: httpx.AsyncClient, timeout: float) -> dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        response = await client.get("/health/ready")
+        if response.status_code == 200:
+            return response.json()
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"App not ready: {response.text}")
+        await asyncio.sleep(0.1)
+
+
+async def _drive(app_url: str, args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=100)
+    async with httpx.AsyncClient(
+        base_url=app_url, timeout=args.request_timeout, limits=limits
+    ) as client:
+        ready = await _warm_up(client, timeout=60.0)
+
+        # Analyse each game once up front: warms the engines and yields
+        # realistic ply lists for the insights requests.
+        payloads: dict[str, list[dict[str, Any]]] = {PGN: [], INSIGHTS: []}
+        for pgn in GAMES:
+            response = await client.post("/pgn", json={"pgn": pgn})
+            response.raise_for_status()
+            analysis = response.json()["analysis"]
+            payloads[PGN].append({"pgn": pgn})
+            for color in ("white", "black"):
+                payloads[INSIGHTS].append({
+                    "plies": analysis["plies"],
+                    "playerColor": color,
+                    "headers": analysis["headers"],
+                })
+
+        steps = []
+        for rps in args.rps:
+            step = await _run_step(client, rps, args, payloads, rng)
+            steps.append(step)
+            print(
+                f"{rps:>7.2f} rps offered  {step['throughputRps']:>7.2f} ok/s"
+                f"  p50 {step['latencySeconds']['p50']}s  p99 {step['latencySeconds']['p99']}s"
+                f"  errors {step['errorRate']:.2%} {step['errors'] or ''}"
+                f"{'  SATURATED' if step['saturated'] else ''}",
+                file=sys.stderr,
+            )
+            if step["saturated"] and not args.keep_going:
+                break
+
+    saturated = next((step for step in steps if step["saturated"]), None)
+    sustained = [step["offeredRps"] for step in steps if not step["saturated"]]
+    return {
+        "startup": ready["startup"],
+        "steps": steps,
+        "maxSustainedRps": max(sustained) if sustained else None,
+        "saturation": {
+            "offeredRps": saturated["offeredRps"],
+            "reasons": saturated["saturationReasons"],
+        } if saturated else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rps", type=lambda value: [float(rps) for rps in value.split(",")],
+        default=[1.0, 2.0, 4.0, 8.0, 16.0], help="Comma-separated request rates to step through",
+    )
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per step")
+    parser.add_argument("--insights-share", type=float, default=0.3, help="Fraction of /learning-insights requests")
+    parser.add_argument("--lane", default="interactive", help="X-Analysis-Lane for /pgn requests")
+    parser.add_argument("--engines", type=int, default=2, help="STOCKFISH_POOL_SIZE")
+    parser.add_argument("--depth", type=int, default=12, help="STOCKFISH_DEPTH")
+    parser.add_argument("--engine-delay", type=float, default=0.005, help="Seconds per fake search")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake LLM call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--p99-slo", type=float, default=5.0, help="p99 latency target in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--min-throughput", type=float, default=0.9,
+        help="Fraction of the offered rate a step must complete to count as sustained",
+    )
+    parser.add_argument("--keep-going", action="store_true", help="Run every step even after saturation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="loadtest-results.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    fake_llm = _fake_llm_app(args.llm_latency, args.llm_error_rate, args.seed)
+    llm = _ServerThread(fake_llm, _free_port())
+    llm.start()
+
+    # Settings are read on first use, so the app picks these up when it starts.
+    os.environ.update({
+        "STOCKFISH_PATH": str(FAKE_ENGINE),
+        "STOCKFISH_POOL_SIZE": str(args.engines),
+        "STOCKFISH_DEPTH": str(args.depth),
+        "FAKE_UCI_DELAY": str(args.engine_delay),
+        "GROQ_API_KEY": "loadtest",
+        "GROQ_BASE_URL": llm.url,
+    })
+    for name in ("ANALYSIS_DB_PATH", "WORK_QUEUE_PATH"):
+        os.environ.pop(name, None)
+
+    from app.main import create_app
+
+    app = create_app()
+    # The app logs every PGN at INFO; keep the report readable.
+    for name in ("chessblunder-api", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    api = _ServerThread(app, _free_port())
+    api.start()
+    try:
+        report = asyncio.run(_drive(api.url, args))
+    finally:
+        api.stop()
+        llm.stop()
+
+    results = {
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "keep_going")
+        },
+        "llmCalls": fake_llm.state.calls,
+        **report,
+    }
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    print(
+        json.dumps({
+            "maxSustainedRps": results["maxSustainedRps"],
+            "saturation": results["saturation"],
+            "output": args.output,
+        }, indent=2)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
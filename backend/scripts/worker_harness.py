@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Local multi-worker harness for the shared work queue.
+
+Starts several `python -m app.worker` processes against a temporary queue
+file, using the stand-in UCI engine, enqueues a batch of games and SIGKILLs
+one worker while it holds a lease. Passes when every task still completes exactly once,
+with the killed worker's tasks recovered after their leases expire.
+
+    cd backend && python scripts/worker_harness.py --workers 3 --tasks 40
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FAKE_ENGINE = Path(__file__).resolve().parent / "fake_uci_engine.py"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.work_queue import ANALYZE_PGN, DONE, LEASED, PENDING, WorkQueue  # noqa: E402
+
+GAMES = [
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O",
+    "1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3 e5 7. Nb3 Be6",
+    "1. d4 Nf6 2. c4 e6 3. Nc3 Bb4 4. e3 O-O 5. Bd3 d5 6. Nf3 c5 7. O-O",
+    "1. e4 e6 2. d4 d5 3. Nc3 Bb4 4. e5 c5 5. a3 Bxc3+ 6. bxc3 Ne7",
+]
+
+
+def _spawn_worker(queue_path: str, worker_id: str, args: argparse.Namespace) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "STOCKFISH_PATH": str(FAKE_ENGINE),
+        "STOCKFISH_DEPTH": "8",
+        "STOCKFISH_POOL_SIZE": str(args.engines),
+        "FAKE_UCI_DELAY": str(args.engine_delay),
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "app.worker",
+            "--queue", queue_path,
+            "--worker-id", worker_id,
+            "--lease-seconds", str(args.lease_seconds),
+            "--poll-interval", "0.1",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--engines", type=int, default=2, help="Engines (and loops) per worker")
+    parser.add_argument("--tasks", type=int, default=40)
+    parser.add_argument("--lease-seconds", type=float, default=2.0)
+    parser.add_argument("--engine-delay", type=float, default=0.005, help="Seconds per fake search")
+    parser.add_argument("--no-kill", action="store_true", help="Don't kill a worker mid-run")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_path = str(Path(tmp) / "work.db")
+        queue = WorkQueue(queue_path)
+        task_ids = [
+            queue.enqueue(ANALYZE_PGN, {"pgn": GAMES[i % len(GAMES)]}) for i in range(args.tasks)
+        ]
+
+        started = time.monotonic()
+        workers = [_spawn_worker(queue_path, f"w{i}", args) for i in range(args.workers)]
+        killed = False
+        try:
+            while time.monotonic() - started < args.timeout:
+                counts = queue.counts()
+                if counts[PENDING] == 0 and counts[LEASED] == 0:
+                    break
+                if not killed and not args.no_kill and args.workers > 1:
+                    # Kill worker 0 while it holds a lease so recovery is exercised.
+                    if any(queue.get(task_id)["worker"] == "w0" for task_id in task_ids):
+                        workers[0].send_signal(signal.SIGKILL)
+                        killed = True
+                time.sleep(0.1)
+            elapsed = time.monotonic() - started
+        finally:
+            for proc in workers:
+                if proc.poll() is None:
+                    proc.send_signal(signal.SIGTERM)
+            for proc in workers:
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+        tasks = [queue.get(task_id) for task_id in task_ids]
+        problems = []
+        for i, task in enumerate(tasks):
+            if task["status"] != DONE:
+                problems.append(f"task {task['id']}: {task['status']} ({task['error']})")
+                continue
+            plies = len(task["result"]["plies"])
+            pgn = GAMES[i % len(GAMES)]
+            want = sum(1 for token in pgn.split() if not token.endswith("."))
+            if plies != want:
+                problems.append(f"task {task['id']}: {plies} plies, expected {want}")
+
+        summary = {
+            "workers": args.workers,
+            "tasks": args.tasks,
+            "killedWorker": "w0" if killed else None,
+            "elapsedSeconds": round(elapsed, 2),
+            "counts": queue.counts(),
+            "retried": sum(1 for task in tasks if task["attempts"] > 1),
+            "problems": problems,
+        }
+        print(json.dumps(summary, indent=2))
+        return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import engine
+
+FAKE_ENGINE = Path(__file__).resolve().parent.parent / "scripts" / "fake_uci_engine.py"
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    """
+    Point the engine pool at the stand-in UCI engine, one process. Tests may
+    set further STOCKFISH_* or FAKE_UCI_* variables before the pool starts.
+    """
+    monkeypatch.setenv("STOCKFISH_PATH", str(FAKE_ENGINE))
+    monkeypatch.setenv("STOCKFISH_POOL_SIZE", "1")
+    monkeypatch.setattr(engine, "_pool", None)
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
@@ -0,0 +1,154 @@
+"""
+AdmissionController driven directly: stride shares, bounded queues and the
+cancelled-after-grant path.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.admission import BATCH, INTERACTIVE, AdmissionController, AdmissionRejected
+
+
+def _controller(capacity: int = 1, *, max_queue: int = 100) -> AdmissionController:
+    return AdmissionController(capacity, {INTERACTIVE: (4, max_queue), BATCH: (1, max_queue)})
+
+
+def test_lanes_share_slots_by_weight_under_contention():
+    async def run() -> list[str]:
+        controller = _controller()
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with controller.admit(BATCH):
+                await release.wait()
+
+        async def request(lane: str) -> None:
+            async with controller.admit(lane):
+                order.append(lane)
+                await asyncio.sleep(0)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        # Both lanes queue far more work than gets served in the window below.
+        requests = [asyncio.create_task(request(lane)) for lane in [INTERACTIVE, BATCH] * 50]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *requests)
+        return order
+
+    order = asyncio.run(run())
+    first = order[:50]
+    assert first.count(INTERACTIVE) == 40
+    assert first.count(BATCH) == 10
+    # Once interactive work runs out, batch gets every slot.
+    assert order[-10:] == [BATCH] * 10
+
+
+def test_idle_lane_does_not_bank_credit():
+    async def run() -> list[str]:
+        controller = _controller()
+        order: list[str] = []
+        release = asyncio.Event()
+
+        # Batch runs alone for a while; interactive sits idle.
+        for _ in range(20):
+            async with controller.admit(BATCH):
+                pass
+
+        async def hold() -> None:
+            async with controller.admit(BATCH):
+                await release.wait()
+
+        async def request(lane: str) -> None:
+            async with controller.admit(lane):
+                order.append(lane)
+                await asyncio.sleep(0)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        requests = [asyncio.create_task(request(lane)) for lane in [INTERACTIVE, BATCH] * 25]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *requests)
+        return order
+
+    order = asyncio.run(run())
+    # Interactive resumes at its 4:1 share instead of replaying 20 idle rounds.
+    assert order[:10].count(BATCH) == 2
+
+
+def test_full_lane_is_rejected_with_retry_after():
+    async def run() -> tuple[AdmissionRejected, dict]:
+        controller = _controller(max_queue=1)
+        release = asyncio.Event()
+
+        async def hold(lane: str) -> None:
+            async with controller.admit(lane):
+                await release.wait()
+
+        holder = asyncio.create_task(hold(INTERACTIVE))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold(INTERACTIVE))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(INTERACTIVE):
+                pass
+        # The other lane still has room in its own queue.
+        other = asyncio.create_task(hold(BATCH))
+        await asyncio.sleep(0)
+        stats = controller.stats()
+
+        release.set()
+        await asyncio.gather(holder, queued, other)
+        return rejected.value, stats
+
+    rejected, stats = asyncio.run(run())
+    assert rejected.lane == INTERACTIVE
+    assert rejected.retry_after >= 1
+    assert stats["lanes"][INTERACTIVE]["rejected"] == 1
+    assert stats["lanes"][INTERACTIVE]["queued"] == 1
+    assert stats["lanes"][BATCH]["queued"] == 1
+    assert stats["lanes"][BATCH]["rejected"] == 0
+
+
+def test_waiter_cancelled_right_after_grant_frees_its_slot():
+    async def run() -> tuple[dict, float, bool, int]:
+        controller = _controller()
+        entered = False
+
+        async def wait_for_slot() -> None:
+            nonlocal entered
+            async with controller.admit(INTERACTIVE):
+                entered = True
+
+        slot = controller.admit(INTERACTIVE)
+        await slot.__aenter__()
+        waiter = asyncio.create_task(wait_for_slot())
+        await asyncio.sleep(0)
+
+        # Releasing grants the slot to the waiter, which doesn't run until we
+        # yield: cancel it first, so it is cancelled holding an unused grant.
+        await slot.__aexit__(None, None, None)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        service_seconds = controller._service_seconds
+
+        stats = controller.stats()
+        # The slot is free again: the next request is admitted without queuing.
+        async with asyncio.timeout(1), controller.admit(BATCH):
+            busy = controller.stats()["busy"]
+        return stats, service_seconds, entered, busy
+
+    stats, service_seconds, entered, busy = asyncio.run(run())
+    assert not entered
+    assert stats["busy"] == 0
+    assert busy == 1
+    assert stats["lanes"][INTERACTIVE]["active"] == 0
+    assert stats["lanes"][INTERACTIVE]["admitted"] == 2
+    # Only the holder's release fed the estimate; the unused grant did not.
+    assert service_seconds == pytest.approx(0.8 * 1.0 + 0.2 * 0.0, abs=0.05)
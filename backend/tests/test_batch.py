@@ -0,0 +1,50 @@
+"""
+Batch analysis must give every game exactly what `analyze_pgn` gives it.
+
+Runs against the stand-in engine in scripts/, whose evals depend only on
+the position, so both paths see the same engine results.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app.services import engine
+from app.services.analysis import analyze_pgn, analyze_pgn_batch
+
+GAMES = [
+    # Shared Ruy Lopez trunk, diverging at different plies.
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6",
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Bxc6 dxc6 5. O-O f6 6. d4 exd4",
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 Nf6 4. O-O Nxe4 5. d4 Nd6 6. Bxc6 dxc6",
+    # The same position reached with a different reversible-move history.
+    "1. Nf3 Nf6 2. Ng1 Ng8 3. Nf3 Nf6 4. Ng1 Ng8 5. e4 e5",
+    "1. e4 e5 2. Nf3 Nf6 3. Ng1 Ng8 4. Nf3 Nf6 5. Ng1 Ng8",
+    # Set up from a FEN with Black to move.
+    '[FEN "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"]\n'
+    '[SetUp "1"]\n\n1... e5 2. Nf3 Nc6 3. Bc4 Bc5',
+]
+
+
+def _canonical(analysis: dict) -> str:
+    return json.dumps(analysis, sort_keys=True)
+
+
+async def _analyze_both() -> tuple[dict, list[dict]]:
+    try:
+        batch = await analyze_pgn_batch(GAMES, depth=8)
+        single = [await analyze_pgn(pgn, depth=8) for pgn in GAMES]
+    finally:
+        await engine.get_engine_pool().close()
+    return batch, single
+
+
+def test_batch_matches_single_game_analysis(fake_engine):
+    batch, single = asyncio.run(_analyze_both())
+
+    assert len(batch["games"]) == len(GAMES)
+    for i, (batched, alone) in enumerate(zip(batch["games"], single), start=1):
+        assert _canonical(batched) == _canonical(alone), f"game {i} differs"
+    assert batch["plies"] == sum(len(analysis["plies"]) for analysis in single)
+    # Shared openings and transpositions are searched once.
+    assert batch["positions"] < batch["plies"]
@@ -0,0 +1,49 @@
+"""
+Engine supervision against a stand-in engine that crashes and hangs at
+seeded, reproducible points.
+"""
+from __future__ import annotations
+
+import asyncio
+
+from app.services import engine
+from app.services.analysis import analyze_pgn
+
+GAMES = [
+    "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O",
+    "1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3 e5 7. Nb3 Be6",
+    "1. d4 Nf6 2. c4 e6 3. Nc3 Bb4 4. e3 O-O 5. Bd3 d5 6. Nf3 c5 7. O-O",
+    "1. e4 e6 2. d4 d5 3. Nc3 Bb4 4. e5 c5 5. a3 Bxc3+ 6. bxc3 Ne7",
+]
+
+
+async def _analyze_all() -> tuple[list[dict], dict]:
+    pool = engine.get_engine_pool()
+    try:
+        analyses = [await analyze_pgn(pgn, depth=8) for pgn in GAMES]
+        return analyses, pool.stats()
+    finally:
+        await pool.close()
+
+
+def test_crashes_and_hangs_are_retried_without_losing_plies(fake_engine, monkeypatch):
+    monkeypatch.setenv("STOCKFISH_WARMUP_DEPTH", "0")
+    clean, clean_stats = asyncio.run(_analyze_all())
+    assert clean_stats["restarts"] == 0
+
+    monkeypatch.setattr(engine, "_pool", None)
+    monkeypatch.setenv("FAKE_UCI_SEED", "7")
+    monkeypatch.setenv("FAKE_UCI_CRASH_RATE", "0.05")
+    monkeypatch.setenv("FAKE_UCI_HANG_RATE", "0.02")
+    monkeypatch.setenv("STOCKFISH_SEARCH_TIMEOUT", "1")
+    monkeypatch.setenv("STOCKFISH_MAX_RETRIES", "3")
+    engine.get_settings.cache_clear()
+    faulty, stats = asyncio.run(_analyze_all())
+
+    # Each failed search was repeated on a fresh process and every ply
+    # computed before a failure was kept: the analyses match a clean run.
+    assert [game["plies"] for game in faulty] == [game["plies"] for game in clean]
+    assert stats["crashes"] > 0
+    assert stats["timeouts"] > 0
+    assert stats["retries"] == stats["crashes"] + stats["timeouts"]
+    assert stats["restarts"] == stats["retries"]
@@ -0,0 +1,85 @@
+"""
+The worker against a real queue file: a large batch must keep its lease,
+which only holds while the event loop is free to heartbeat.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+
+import chess
+
+from app.services.work_queue import ANALYZE_PGN_BATCH, DONE, PENDING, WorkQueue
+from app.worker import Worker
+
+LEASE_SECONDS = 0.5
+
+
+def _random_game(plies: int, seed: int) -> str:
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    for _ in range(plies):
+        legal = sorted(board.legal_moves, key=lambda move: move.uci())
+        if not legal:
+            break
+        moves.append(rng.choice(legal))
+        board.push(moves[-1])
+    return chess.Board().variation_san(moves)
+
+
+def test_large_batch_keeps_its_lease(fake_engine, monkeypatch, tmp_path):
+    monkeypatch.delenv("ANALYSIS_DB_PATH", raising=False)
+    monkeypatch.setenv("STOCKFISH_WARMUP_DEPTH", "0")
+    path = str(tmp_path / "work.db")
+    queue = WorkQueue(path)
+    # Copies of one long game: few positions to search, but every game is
+    # still parsed, planned and fanned out, seconds of CPU in all.
+    task_id = queue.enqueue(ANALYZE_PGN_BATCH, {"pgns": [_random_game(80, seed=3)] * 120, "depth": 8})
+
+    # Another worker, on its own thread, takes the task the moment its lease lapses.
+    done = threading.Event()
+    stolen = threading.Event()
+
+    def steal() -> None:
+        thief = WorkQueue(path)
+        while not done.is_set():
+            if thief.claim("thief", lease_seconds=60) is not None:
+                stolen.set()
+                return
+            done.wait(0.02)
+
+    async def run() -> dict:
+        worker = Worker(
+            queue,
+            worker_id="worker",
+            concurrency=1,
+            lease_seconds=LEASE_SECONDS,
+            poll_interval=0.05,
+        )
+        running = asyncio.create_task(worker.run())
+        thief = threading.Thread(target=steal)
+        try:
+            async with asyncio.timeout(60):
+                while (await asyncio.to_thread(queue.get, task_id))["status"] == PENDING:
+                    await asyncio.sleep(0.01)
+                thief.start()
+                while not stolen.is_set():
+                    if (await asyncio.to_thread(queue.get, task_id))["status"] == DONE:
+                        break
+                    await asyncio.sleep(0.05)
+        finally:
+            done.set()
+            if thief.is_alive():
+                await asyncio.to_thread(thief.join)
+            worker.stop()
+            await running
+        return await asyncio.to_thread(queue.get, task_id)
+
+    task = asyncio.run(run())
+    assert not stolen.is_set()
+    assert task["status"] == DONE
+    assert task["attempts"] == 1
+    assert task["worker"] is None
+    assert len(task["result"]["games"]) == 120